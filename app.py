@@ -1,57 +1,34 @@
 #!/usr/bin/env python3
 """落先生的文献小窝 - 信任度评估专题 V3.0 (500篇文献版)"""
 
-from flask import Flask, render_template_string, send_from_directory, jsonify
+from flask import Flask, send_from_directory, jsonify, request, Response, stream_with_context
 import os
 import json
+import gzip
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 
-app = Flask(__name__)
-LITERATURE_DIR = "/Users/lcy/clawd/clawpaper"
-
-def load_papers():
-    # 优先加载新的500篇文献
-    new_papers_file = os.path.join(LITERATURE_DIR, "papers.json")
-    if os.path.exists(new_papers_file):
-        with open(new_papers_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            papers = data.get("papers", [])
-            stats = data.get("statistics", {})
-            return papers, stats
-    
-    # 回退到原有文献
-    old_papers_file = os.path.join(LITERATURE_DIR, "papers_full.json")
-    if os.path.exists(old_papers_file):
-        with open(old_papers_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("papers", []), {}
-    
-    return [], {}
-
-PAPERS_DATA, STATS = load_papers()
+from markupsafe import escape
 
-# 提取所有唯一维度
-ALL_DIMENSIONS = set()
-for paper in PAPERS_DATA:
-    if paper.get("trust_dimensions"):
-        ALL_DIMENSIONS.update(paper["trust_dimensions"].keys())
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
 
-# 统计年份分布
-YEAR_DISTRIBUTION = {}
-for paper in PAPERS_DATA:
-    year = paper.get("year", 0)
-    YEAR_DISTRIBUTION[year] = YEAR_DISTRIBUTION.get(year, 0) + 1
+from paper_store import (LITERATURE_DIR, SORT_KEYS, current_snapshot, start_watcher, filter_mask, facet_counts, query, search,
+                         sqlite_backend, start_pdf_indexer, current_pdf_index)
+from profiling import PROFILE_ENABLED, PROFILE_DIR, ProfilingMiddleware, list_artifacts, requested_mode
+from metrics import REGISTRY, REQUESTS, REQUEST_LATENCY, RESPONSE_SIZE, PHASE_LATENCY, CONTENT_TYPE, PhaseTimer
 
-# 统计期刊级别
-JOURNAL_LEVELS = {}
-for paper in PAPERS_DATA:
-    level = paper.get("journal_info", {}).get("ranking", "Unknown")
-    JOURNAL_LEVELS[level] = JOURNAL_LEVELS.get(level, 0) + 1
+app = Flask(__name__)
 
-SUMMARY = f"""
+SUMMARY_TEMPLATE = """
 落先生，小女仆的学习总结来啦！
 
-📚 信任度评估文献已扩充至 {len(PAPERS_DATA)} 篇！
+📚 信任度评估文献已扩充至 {count} 篇！
 
 核心研究领域分布：
 - AI系统可信度: 约150篇 (30%)
@@ -62,17 +39,28 @@ SUMMARY = f"""
 - 领域特定应用: 约70篇 (14%)
 
 📊 期刊/会议级别分布：
-- SCI Q1 / CCF-A: {STATS.get('sci_q1_ccf_a', 0)}篇
-- SCI Q2 / CCF-B: {STATS.get('sci_q2_ccf_b', 0)}篇
-- SCI Q3 / CCF-C: {STATS.get('sci_q3_ccf_c', 0)}篇
-- EI: {STATS.get('ei', 0)}篇
-- 其他: {STATS.get('other', 0)}篇
+- SCI Q1 / CCF-A: {sci_q1_ccf_a}篇
+- SCI Q2 / CCF-B: {sci_q2_ccf_b}篇
+- SCI Q3 / CCF-C: {sci_q3_ccf_c}篇
+- EI: {ei}篇
+- 其他: {other}篇
 
 小女仆的感悟：
 500篇文献涵盖了信任评估的方方面面，从理论框架到实践应用，
 从AI可信度到人机协作，从小样本到大数据 - 这是信任研究的一座宝库呢～ 🐱✨
 """
 
+def make_summary(snapshot):
+    stats = snapshot.stats
+    return SUMMARY_TEMPLATE.format(
+        count=len(snapshot.papers),
+        sci_q1_ccf_a=stats.get('sci_q1_ccf_a', 0),
+        sci_q2_ccf_b=stats.get('sci_q2_ccf_b', 0),
+        sci_q3_ccf_c=stats.get('sci_q3_ccf_c', 0),
+        ei=stats.get('ei', 0),
+        other=stats.get('other', 0),
+    )
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-CN">
@@ -309,6 +297,8 @@ HTML_TEMPLATE = """
                 <button class="sort-btn" data-sort="if_asc">📉 影响因子↑</button>
                 <button class="sort-btn" data-sort="year_desc">🆕 最新发布</button>
                 <button class="sort-btn" data-sort="year_asc">📜 最早发布</button>
+                <button class="sort-btn" data-sort="ranking">🏅 期刊级别</button>
+                <input type="search" class="dimension-select" id="searchInput" placeholder="🔍 检索标题/摘要/标签">
                 <select class="dimension-select" id="dimensionFilter">
                     <option value="">🎯 按信任维度筛选</option>
                     DIM_OPTIONS
@@ -339,14 +329,27 @@ HTML_TEMPLATE = """
     </div>
     
     <script>
-        let allPapers = PAPERS_JSON;
         let currentSort = 'default';
         let currentDimension = '';
+        let currentQuery = '';
+        const paperDetails = new Map();
+        
+        function fetchPaper(paperId) {
+            // 详情按需从 /api/papers/<id> 取，取过的留在内存里
+            if (!paperDetails.has(paperId)) {
+                paperDetails.set(paperId, fetch('/api/papers/' + encodeURIComponent(paperId)).then(resp => {
+                    if (!resp.ok) throw new Error(resp.status);
+                    return resp.json();
+                }).catch(err => { paperDetails.delete(paperId); throw err; }));
+            }
+            return paperDetails.get(paperId);
+        }
         
         function showModal(paperId) {
-            const paper = allPapers.find(p => p.id === paperId);
-            if (!paper) return;
-            
+            fetchPaper(paperId).then(renderModal).catch(err => console.error(err));
+        }
+        
+        function renderModal(paper) {
             let journalInfoHtml = '';
             if (paper.journal_info) {
                 const journal = paper.journal_info;
@@ -392,82 +395,33 @@ HTML_TEMPLATE = """
             navigator.clipboard.writeText(content).then(() => alert('BibTeX 已复制到剪贴板！'));
         }
         
+        const cardsById = {};
+        document.querySelectorAll('#papersGrid .paper-card').forEach(card => { cardsById[card.dataset.id] = card; });
+        let queryController = null;
+        
         function sortAndFilterPapers() {
-            let filtered = allPapers;
-            if (currentDimension) {
-                filtered = allPapers.filter(p => p.trust_dimensions && Object.keys(p.trust_dimensions).some(k => k.toLowerCase().includes(currentDimension.toLowerCase())));
-            }
-            
-            filtered.sort((a, b) => {
-                if (currentSort === 'default') return 0;
-                if (currentSort === 'if_desc') {
-                    const aIf = (a.journal_info && a.journal_info.impact_factor) || 0;
-                    const bIf = (b.journal_info && b.journal_info.impact_factor) || 0;
-                    return bIf - aIf;
-                }
-                if (currentSort === 'if_asc') {
-                    const aIf = (a.journal_info && a.journal_info.impact_factor) || 0;
-                    const bIf = (b.journal_info && b.journal_info.impact_factor) || 0;
-                    return aIf - bIf;
-                }
-                if (currentSort === 'year_desc') return b.year - a.year;
-                if (currentSort === 'year_asc') return a.year - b.year;
-                return 0;
-            });
-            
-            renderPapers(filtered);
+            // 排序和筛选在服务端用预计算的索引完成，这里只按返回的 id 顺序渲染
+            if (queryController) queryController.abort();
+            queryController = new AbortController();
+            // 有检索词时按相关度排序，否则按当前排序方式
+            const params = new URLSearchParams({ format: 'ids' });
+            if (currentQuery) params.set('q', currentQuery);
+            else params.set('sort', currentSort);
+            if (currentDimension) params.set('dimension', currentDimension);
+            const endpoint = currentQuery ? '/api/search?' : '/api/query?';
+            fetch(endpoint + params.toString(), { signal: queryController.signal })
+                .then(resp => resp.json())
+                .then(data => renderPapers(data.ids))
+                .catch(err => { if (err.name !== 'AbortError') console.error(err); });
         }
         
-        function renderPapers(papers) {
+        function renderPapers(ids) {
+            // 卡片由服务端渲染，这里只按 id 顺序重排、隐藏未命中的卡片
             const grid = document.getElementById('papersGrid');
             const noResults = document.getElementById('noResults');
-            
-            if (papers.length === 0) {
-                grid.innerHTML = '';
-                noResults.style.display = 'block';
-                return;
-            }
-            noResults.style.display = 'none';
-            
-            grid.innerHTML = papers.map(paper => {
-                const journal = paper.journal_info || {};
-                const ranking = journal.ranking || '';
-                const impact = journal.impact_factor || 0;
-                const rankingClass = ranking.toLowerCase().replace(/\\s+/g, '-');
-                
-                let btnDownload = '';
-                if (paper.file) {
-                    btnDownload = '<a href="/download/' + paper.file + '" class="btn btn-download"><i class="fas fa-download"></i> PDF</a>';
-                }
-                
-                let btnAccess = '';
-                if (journal.access_url) {
-                    btnAccess = '<a href="' + journal.access_url + '" target="_blank" class="btn btn-access"><i class="fas fa-external-link-alt"></i> 访问</a>';
-                }
-                
-                let dimensionsPreview = '';
-                if (paper.trust_dimensions) {
-                    const dims = Object.keys(paper.trust_dimensions);
-                    const dimTags = dims.slice(0, 4).map(k => '<span class="dimension-tag">' + k + '</span>').join('');
-                    const more = dims.length > 4 ? '<span class="dimension-tag">+更多</span>' : '';
-                    dimensionsPreview = '<div class="dimensions-preview">' + dimTags + more + '</div>';
-                }
-                
-                let badges = '<span class="badge badge-' + rankingClass + '">' + ranking + '</span>';
-                if (journal.impact_factor_label) {
-                    badges += '<span class="badge badge-if">' + journal.impact_factor_label + '</span>';
-                }
-                badges += '<span class="badge badge-publisher">' + (journal.publisher || paper.institution) + '</span>';
-                
-                return '<article class="paper-card" data-ranking="' + ranking + '" data-if="' + impact + '" data-year="' + paper.year + '">' +
-                    '<span class="paper-year-badge">' + paper.year + '</span>' +
-                    '<h3 class="paper-title">' + paper.title + '</h3>' +
-                    '<div class="paper-meta"><i class="fas fa-user"></i> ' + paper.authors.join(', ') + '<br><i class="fas fa-university"></i> ' + paper.institution + '</div>' +
-                    '<div class="badges">' + badges + '</div>' +
-                    '<div class="paper-abstract">' + paper.abstract.substring(0, 150) + '...</div>' +
-                    dimensionsPreview +
-                    '<div class="action-btns">' + btnDownload + btnAccess + '<button class="btn btn-detail" onclick="showModal(\\'' + paper.id + '\\')"><i class="fas fa-info-circle"></i> 详情</button></div></article>';
-            }).join('');
+            const cards = ids.map(id => cardsById[id]).filter(Boolean);
+            grid.replaceChildren(...cards);
+            noResults.style.display = cards.length === 0 ? 'block' : 'none';
         }
         
         document.querySelectorAll('.sort-btn').forEach(btn => {
@@ -484,6 +438,13 @@ HTML_TEMPLATE = """
             sortAndFilterPapers();
         });
         
+        let searchTimer = null;
+        document.getElementById('searchInput').addEventListener('input', function() {
+            clearTimeout(searchTimer);
+            const value = this.value.trim();
+            searchTimer = setTimeout(() => { currentQuery = value; sortAndFilterPapers(); }, 250);
+        });
+        
         // 生成侧边栏统计
         generateSidebar();
         
@@ -497,7 +458,17 @@ HTML_TEMPLATE = """
         const sidebar = document.getElementById('sidebarSection');
         if (!sidebar) return;
         
-        const topDims = dimensionStats.top_dimensions.slice(0, 10);
+        // 统计由服务端分面接口给出，不在浏览器里遍历文献
+        fetch('/api/facets?dim_limit=10').then(resp => resp.json()).then(facets => renderSidebar(sidebar, facets));
+    }
+    
+    function renderSidebar(sidebar, facets) {
+        const topDims = facets.dimension.map(item => ({
+            dimension: item.dimension,
+            count: item.count,
+            percentage: (item.count / Math.max(facets.total, 1) * 100).toFixed(1)
+        }));
+        if (topDims.length === 0) return;
         
         let html = `
             <div class="sidebar-section">
@@ -534,15 +505,15 @@ HTML_TEMPLATE = """
                 <h3><i class="fas fa-chart-bar"></i> 统计概览</h3>
                 <div class="stat-row">
                     <span>📚 文献总数</span>
-                    <strong>${dimensionStats.total_papers}</strong>
+                    <strong>${facets.total}</strong>
                 </div>
                 <div class="stat-row">
                     <span>🎯 唯一维度</span>
-                    <strong>${dimensionStats.unique_dimensions}</strong>
+                    <strong>${facets.unique_dimensions}</strong>
                 </div>
                 <div class="stat-row">
-                    <span>📊 维度总数</span>
-                    <strong>${dimensionStats.total_dimensions}</strong>
+                    <span>📅 年份跨度</span>
+                    <strong>${Object.keys(facets.year).length}</strong>
                 </div>
             </div>
         `;
@@ -550,15 +521,15 @@ HTML_TEMPLATE = """
         sidebar.innerHTML = html;
         
         // 初始化图表
-        setTimeout(() => initChart(), 100);
+        setTimeout(() => initChart(topDims), 100);
     }
     
-    function initChart() {
+    function initChart(topDims) {
         const canvas = document.getElementById('dimensionChart');
         if (!canvas) return;
         
         const ctx = canvas.getContext('2d');
-        const data = dimensionStats.top_dimensions.slice(0, 8);
+        const data = topDims.slice(0, 8);
         
         new Chart(ctx, {
             type: 'doughnut',
@@ -766,102 +737,685 @@ document.addEventListener('DOMContentLoaded', function() {
 </html>
 """
 
-def generate_papers_html(papers):
-    return "PLACEHOLDER"
+# 论文卡片模板：编译一次，字段统一转义，不会再被 .replace 串改
+CARD_TEMPLATE = app.jinja_env.from_string('''<article class="paper-card" data-id="{{ paper.id }}" data-ranking="{{ ranking }}" data-if="{{ impact }}" data-year="{{ paper.year }}">
+            <span class="paper-year-badge">{{ paper.year }}</span>
+            <h3 class="paper-title">{{ paper.title }}</h3>
+            <div class="paper-meta"><i class="fas fa-user"></i> {{ paper.authors|join(', ') }}<br><i class="fas fa-university"></i> {{ paper.institution }}</div>
+            <div class="badges"><span class="badge badge-{{ ranking_class }}">{{ ranking }}</span>{% if journal.impact_factor_label %}<span class="badge badge-if">{{ journal.impact_factor_label }}</span>{% endif %}<span class="badge badge-publisher">{{ publisher }}</span></div>
+            <div class="paper-abstract">{{ (paper.abstract or '')[:150] }}...</div>
+            {% if dims %}<div class="dimensions-preview">{% for k in dims[:4] %}<span class="dimension-tag">{{ k }}</span>{% endfor %}{% if dims|length > 4 %}<span class="dimension-tag">+更多</span>{% endif %}</div>{% endif %}
+            <div class="action-btns">{% if paper.file %}<a href="/download/{{ paper.file }}" class="btn btn-download"><i class="fas fa-download"></i> PDF</a>{% endif %} {% if access_url %}<a href="{{ access_url }}" target="_blank" class="btn btn-access"><i class="fas fa-external-link-alt"></i> 访问</a>{% endif %} <button class="btn btn-detail" onclick="showModal(this.closest('.paper-card').dataset.id)"><i class="fas fa-info-circle"></i> 详情</button></div>
+        </article>''')
 
-@app.route('/')
-def index():
-    html = HTML_TEMPLATE
-    html = html.replace('PAPERS_COUNT', str(len(PAPERS_DATA)))
-    html = html.replace('STATS_Q1', str(STATS.get('sci_q1_ccf_a', 0)))
-    html = html.replace('STATS_Q2', str(STATS.get('sci_q2_ccf_b', 0)))
-    html = html.replace('STATS_Q3', str(STATS.get('sci_q3_ccf_c', 0)))
-    html = html.replace('STATS_EI', str(STATS.get('ei', 0)))
-    html = html.replace('DIM_COUNT', str(len(ALL_DIMENSIONS)))
-    html = html.replace('CURRENT_DATE', datetime.now().strftime("%Y年%m月%d日"))
-    html = html.replace('SUMMARY_CONTENT', SUMMARY)
-    html = html.replace('PAPERS_JSON', json.dumps(PAPERS_DATA, ensure_ascii=False))
+def render_card(paper):
+    journal_info = paper.get('journal_info', {})
+    ranking = journal_info.get('ranking', '') if journal_info else ''
+    return CARD_TEMPLATE.render(
+        paper=paper,
+        journal=journal_info or {},
+        ranking=ranking or '',
+        ranking_class=ranking.lower().replace(' ', '-') if ranking else 'na',
+        impact=journal_info.get('impact_factor', 0) if journal_info else 0,
+        access_url=journal_info.get('access_url', '') if journal_info else '',
+        publisher=journal_info.get('publisher', '') if journal_info else paper.get('institution', ''),
+        dims=list((paper.get('trust_dimensions') or {}).keys()),
+    )
+
+# 卡片片段缓存：按论文内容哈希索引，数据更新后只重新渲染改动过的论文
+_CARD_CACHE = {}
+_CARD_CACHE_LOCK = threading.Lock()
+
+def iter_cards(snapshot):
+    for i, content_hash in enumerate(snapshot.paper_hashes):
+        card = _CARD_CACHE.get(content_hash)
+        if card is None:
+            # 只有未命中的论文才取出记录（JSONL 语料下会解码对应的一行）
+            card = _CARD_CACHE[content_hash] = render_card(snapshot.papers[i])
+        yield card
+    # 只保留当前快照用到的片段
+    live = set(snapshot.paper_hashes)
+    with _CARD_CACHE_LOCK:
+        for content_hash in [h for h in list(_CARD_CACHE) if h not in live]:
+            _CARD_CACHE.pop(content_hash, None)
+
+# 首页按卡片区域切成头、尾两段，便于流式输出
+INDEX_HEAD, INDEX_TAIL = HTML_TEMPLATE.split('PAPERS_HTML', 1)
+# 流式输出时每批发送的卡片数
+CARDS_PER_CHUNK = 50
+
+def iter_index_html(snapshot, current_date):
+    """先输出 head/CSS/页头/统计，再分批输出卡片，最后是页脚和脚本"""
+    started = time.perf_counter()
+    stats = snapshot.stats
+    head = INDEX_HEAD
+    head = head.replace('PAPERS_COUNT', str(len(snapshot.papers)))
+    head = head.replace('STATS_Q1', str(stats.get('sci_q1_ccf_a', 0)))
+    head = head.replace('STATS_Q2', str(stats.get('sci_q2_ccf_b', 0)))
+    head = head.replace('STATS_Q3', str(stats.get('sci_q3_ccf_c', 0)))
+    head = head.replace('STATS_EI', str(stats.get('ei', 0)))
+    head = head.replace('DIM_COUNT', str(len(snapshot.dimensions)))
+    head = head.replace('SUMMARY_CONTENT', make_summary(snapshot))
     
     # 维度选项
     dim_options = '<option value="">🎯 按信任维度筛选</option>'
-    for dim in sorted(ALL_DIMENSIONS):
-        dim_options += '<option value="' + dim + '">' + dim + '</option>'
-    html = html.replace('DIM_OPTIONS', dim_options)
+    for dim in sorted(snapshot.dimensions):
+        dim_options += '<option value="' + escape(dim) + '">' + escape(dim) + '</option>'
+    head = head.replace('DIM_OPTIONS', dim_options)
+    PHASE_LATENCY.observe(time.perf_counter() - started, '/', 'template')
+    yield head
     
+    # 生成论文卡片（计时不含 yield 出去等待发送的时间）
+    timer = PhaseTimer()
+    batch = []
+    for card in iter_cards(snapshot):
+        batch.append(card)
+        if len(batch) >= CARDS_PER_CHUNK:
+            chunk = ''.join(batch)
+            batch = []
+            timer.pause()
+            yield chunk
+            timer.resume()
+    if batch:
+        chunk = ''.join(batch)
+        timer.pause()
+        yield chunk
+    else:
+        timer.pause()
+    timer.observe('/', 'cards')
     
-    
-    # 生成论文卡片
-    papers_html = []
-    for paper in PAPERS_DATA:
-        journal_info = paper.get('journal_info', {})
-        ranking = journal_info.get('ranking', '') if journal_info else ''
-        impact = journal_info.get('impact_factor', 0) if journal_info else 0
-        access_url = journal_info.get('access_url', '') if journal_info else ''
-        publisher = journal_info.get('publisher', '') if journal_info else paper.get('institution', '')
-        
-        btn_download = ''
-        if paper.get('file'):
-            btn_download = '<a href="/download/' + paper['file'] + '" class="btn btn-download"><i class="fas fa-download"></i> PDF</a>'
-        
-        btn_access = ''
-        if access_url:
-            btn_access = '<a href="' + access_url + '" target="_blank" class="btn btn-access"><i class="fas fa-external-link-alt"></i> 访问</a>'
-        
-        dimensions_preview = ''
-        if paper.get('trust_dimensions'):
-            dims = list(paper['trust_dimensions'].keys())
-            dim_tags = ''.join(['<span class="dimension-tag">' + k + '</span>' for k in dims[:4]])
-            more = '<span class="dimension-tag">+更多</span>' if len(dims) > 4 else ''
-            dimensions_preview = '<div class="dimensions-preview">' + dim_tags + more + '</div>'
-        
-        ranking_class = ranking.lower().replace(' ', '-') if ranking else 'na'
-        badges = '<span class="badge badge-' + ranking_class + '">' + ranking + '</span>'
-        if journal_info.get('impact_factor_label'):
-            badges += '<span class="badge badge-if">' + journal_info['impact_factor_label'] + '</span>'
-        badges += '<span class="badge badge-publisher">' + publisher + '</span>'
-        
-        # 封面图片（已移除）
-        card = '''<article class="paper-card" data-ranking="RANKING" data-if="IMPACT" data-year="YEAR">
-            <span class="paper-year-badge">YEAR</span>
-            <h3 class="paper-title">TITLE</h3>
-            <div class="paper-meta"><i class="fas fa-user"></i> AUTHORS<br><i class="fas fa-university"></i> INSTITUTION</div>
-            <div class="badges">BADGES</div>
-            <div class="paper-abstract">ABSTRACT...</div>
-            DIMENSIONS_PREVIEW
-            <div class="action-btns">BTN_DOWNLOAD BTN_ACCESS <button class="btn btn-detail" onclick="showModal('ID')"><i class="fas fa-info-circle"></i> 详情</button></div>
-        </article>'''
-        
-        card = card.replace('TITLE', paper['title'])\
-                   .replace('AUTHORS', ', '.join(paper['authors']))\
-                   .replace('INSTITUTION', paper['institution'])\
-                   .replace('YEAR', str(paper['year']))\
-                   .replace('RANKING', ranking)\
-                   .replace('IMPACT', str(impact))\
-                   .replace('BADGES', badges)\
-                   .replace('ABSTRACT', paper['abstract'][:150])\
-                   .replace('DIMENSIONS_PREVIEW', dimensions_preview)\
-                   .replace('BTN_DOWNLOAD', btn_download)\
-                   .replace('BTN_ACCESS', btn_access)\
-                   .replace('ID', paper['id'])
-        papers_html.append(card)
-    
-    html = html.replace('PAPERS_HTML', ''.join(papers_html))
-    return html
+    tail = INDEX_TAIL
+    tail = tail.replace('CURRENT_DATE', current_date)
+    yield tail
+
+# 首页渲染缓存：每个 (数据版本, 日期) 只渲染一次，并预先压缩好
+_RENDER_CACHE = {}
+_RENDER_LOCK = threading.Lock()
+
+def index_cache_key(snapshot):
+    return (snapshot.version, datetime.now().strftime("%Y年%m月%d日"))
+
+def build_render_entry(raw):
+    entry = {
+        'etag': hashlib.sha1(raw).hexdigest()[:16],
+        'identity': raw,
+        'gzip': gzip.compress(raw, compresslevel=9),
+    }
+    if brotli is not None:
+        entry['br'] = brotli.compress(raw, quality=11)
+    return entry
+
+def store_render_entry(key, raw):
+    started = time.perf_counter()
+    entry = build_render_entry(raw)
+    PHASE_LATENCY.observe(time.perf_counter() - started, '/', 'compress')
+    with _RENDER_LOCK:
+        # 只保留最新一份，旧版本/旧日期直接丢弃
+        _RENDER_CACHE.clear()
+        _RENDER_CACHE[key] = entry
+    return entry
+
+class PendingRender:
+    """一次进行中的首页渲染：渲染线程追加分块，任意多个请求同时跟随读取
+
+    整页渲染完并压缩好后 future 给出缓存条目，同步调用方 future.result()，
+    asgi.py 用 asyncio.wrap_future() 等待，不占线程。
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.future = Future()
+        self._cond = threading.Condition()
+
+    def feed(self, data):
+        with self._cond:
+            self.parts.append(data)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def iter_parts(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.parts) and not self.done:
+                    self._cond.wait()
+                if i < len(self.parts):
+                    data = self.parts[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield data
+
+# 进行中的渲染，同一个键同时只有一个
+_RENDER_PENDING = {}
+
+def _render_worker(snapshot, key, pending):
+    entry = error = None
+    try:
+        for part in iter_index_html(snapshot, key[1]):
+            pending.feed(part.encode('utf-8'))
+        pending.finish()
+        entry = store_render_entry(key, b''.join(pending.parts))
+    except BaseException as exc:
+        error = exc
+        pending.finish(exc)
+    # 先撤下登记再唤醒等待方：它们返回时这个线程已不再持有任何锁（wsgi.py 随后会 fork）
+    with _RENDER_LOCK:
+        if _RENDER_PENDING.get(key) is pending:
+            del _RENDER_PENDING[key]
+    if error is not None:
+        pending.future.set_exception(error)
+    else:
+        pending.future.set_result(entry)
+
+def start_render(snapshot, key, inline=False):
+    """返回 (缓存条目, None) 或 (None, PendingRender)；未命中时只有第一个调用方启动渲染线程
+
+    inline=True 时由调用方线程自己完成渲染再返回（剖析请求用，否则剖析器只看得到等待）。
+    """
+    with _RENDER_LOCK:
+        entry = _RENDER_CACHE.get(key)
+        if entry is not None:
+            return entry, None
+        pending = _RENDER_PENDING.get(key)
+        if pending is not None:
+            return None, pending
+        pending = _RENDER_PENDING[key] = PendingRender()
+        if not inline:
+            threading.Thread(target=_render_worker, args=(snapshot, key, pending),
+                             name='index-render', daemon=True).start()
+    if inline:
+        _render_worker(snapshot, key, pending)
+    return None, pending
+
+def get_rendered_index(snapshot):
+    key = index_cache_key(snapshot)
+    entry = _RENDER_CACHE.get(key)
+    if entry is None:
+        entry, pending = start_render(snapshot, key)
+        if entry is None:
+            entry = pending.future.result()
+    return entry
+
+# 请求指标：路由按 URL 规则归并（/download/<filename> 只算一条），见 metrics.py
+def request_route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def record_request(route, method, started, size):
+    REQUEST_LATENCY.observe(time.perf_counter() - started, route, method)
+    RESPONSE_SIZE.observe(size, route)
+
+def iter_counted(body, route, method, started):
+    """流式响应：统计实际发送的字节数，最后一块发出后再记录耗时"""
+    size = 0
+    try:
+        for chunk in body:
+            size += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+        record_request(route, method, started, size)
+
+@app.before_request
+def start_request_timer():
+    request.environ['clawpaper.started'] = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = request.environ.get('clawpaper.started')
+    if started is None:
+        return response
+    route = request_route()
+    REQUESTS.inc(route, request.method, str(response.status_code))
+    if response.is_streamed and response.content_length is None:
+        response.response = iter_counted(response.response, route, request.method, started)
+    else:
+        size = response.content_length
+        record_request(route, request.method, started, size if size is not None else response.calculate_content_length() or 0)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.expose(), content_type=CONTENT_TYPE)
+
+if PROFILE_ENABLED:
+    # 按需剖析（见 profiling.py）：?_profile=1 或 ?_profile=sample
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, PROFILE_DIR)
+
+    @app.route('/debug/profiles')
+    def list_profiles():
+        return jsonify({"profiles": sorted(list_artifacts(PROFILE_DIR), reverse=True)})
+
+    @app.route('/debug/profiles/<name>')
+    def download_profile(name):
+        return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+REGISTRY.gauge('clawpaper_snapshot_papers', '当前快照的论文数', lambda: len(current_snapshot().papers))
+
+@app.route('/')
+def index():
+    snapshot = current_snapshot()
+    key = index_cache_key(snapshot)
+    entry = _RENDER_CACHE.get(key)
+    if entry is None:
+        # 被剖析的请求在本线程渲染，剖析结果才包含卡片渲染本身
+        profiled = PROFILE_ENABLED and requested_mode(request.environ) is not None
+        entry, pending = start_render(snapshot, key, inline=profiled)
+    if entry is None:
+        # 首次渲染（启动或数据更新后）不等整页拼完，边渲染边发送；
+        # 并发的请求共用同一次渲染，跟随读取已生成的分块
+        resp = Response(pending.iter_parts(), mimetype='text/html')
+        resp.headers['Vary'] = 'Accept-Encoding'
+        return resp
+    encoding = 'identity'
+    for candidate in ('br', 'gzip'):
+        if candidate in entry and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    resp = Response(entry[encoding], mimetype='text/html')
+    if encoding != 'identity':
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.set_etag(entry['etag'] + '-' + encoding)
+    return resp.make_conditional(request)
 
 @app.route('/download/<filename>')
 def download_file(filename):
     return send_from_directory(LITERATURE_DIR, filename, as_attachment=True)
 
+@app.route('/api/papers/<paper_id>')
+def api_paper_detail(paper_id):
+    """单篇详情：按快照的 id 索引 O(1) 查找，ETag 为论文内容哈希"""
+    snapshot = current_snapshot()
+    backend = sqlite_backend(snapshot)
+    if backend is not None:
+        data = backend.get_json(paper_id)
+        if data is None:
+            return jsonify({"error": "文献不存在"}), 404
+        resp = jsonify(json.loads(data))
+        resp.set_etag(hashlib.sha1(data.encode('utf-8')).hexdigest()[:16])
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp.make_conditional(request)
+    index = snapshot.id_index.get(paper_id)
+    if index is None:
+        return jsonify({"error": "文献不存在"}), 404
+    resp = jsonify(snapshot.papers[index])
+    resp.set_etag(snapshot.paper_hashes[index][:16])
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+@app.route('/api/papers/<paper_id>/related')
+def api_paper_related(paper_id):
+    """相关论文：快照构建时已算好 top-k，这里只按下标取出"""
+    snapshot = current_snapshot()
+    index = snapshot.id_index.get(paper_id)
+    if index is None:
+        return jsonify({"error": "文献不存在"}), 404
+    try:
+        limit = int_arg('limit', snapshot.related.k, 1, snapshot.related.k)
+    except ValueError:
+        return jsonify({"error": f"limit 取值 1-{snapshot.related.k}"}), 400
+    hits = snapshot.related.related(index, limit)
+    papers = [snapshot.papers[i] for i, _ in hits]
+    fields = parse_fields(request.args.get('fields', ''))
+    if fields:
+        papers = [project_paper(paper, fields) for paper in papers]
+    return jsonify({
+        "id": paper_id,
+        "papers": papers,
+        "scores": [round(score, 4) for _, score in hits],
+        "version": snapshot.version
+    })
+
+# /api/papers 分页参数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+PAGINATION_ARGS = ('limit', 'offset', 'fields')
+
+def parse_fields(spec):
+    """把 'id,title,journal_info.ranking' 解析成路径元组列表"""
+    paths = []
+    for item in spec.split(','):
+        item = item.strip()
+        if item:
+            paths.append(tuple(item.split('.')))
+    return paths
+
+def project_paper(paper, paths):
+    """只保留 paths 指定的字段，嵌套字段保持原有层级"""
+    result = {}
+    for path in paths:
+        value = paper
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = result
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+    return result
+
+def int_arg(name, default, minimum, maximum=None):
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return default
+    value = int(raw)
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(name)
+    return value
+
 @app.route('/api/papers')
 def api_papers():
+    snapshot = current_snapshot()
+    if any(name in request.args for name in PAGINATION_ARGS):
+        return api_papers_page(snapshot)
+    data = _EXPORT_CACHE.get(snapshot.version)
+    if data is not None:
+        return Response(data, mimetype='application/json')
+    # 全量导出：逐篇编码、分块发送，不在内存里拼出整个响应
+    return Response(stream_with_context(iter_papers_json(snapshot)), mimetype='application/json')
+
+STREAM_CHUNK_SIZE = 64 * 1024
+_stream_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+def iter_papers_json(snapshot):
+    """生成与旧版 jsonify 相同结构的 JSON：papers 数组逐篇编码，约 64KB 一块"""
+    encode = _stream_encoder.encode
+    timer = PhaseTimer()
+    buf = ['{"papers":[']
+    size = 0
+    for i, paper in enumerate(snapshot.papers):
+        piece = encode(paper)
+        buf.append(piece if i == 0 else ',' + piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            chunk = ''.join(buf).encode('utf-8')
+            buf = []
+            size = 0
+            timer.pause()
+            yield chunk
+            timer.resume()
+    buf.append('],"stats":' + encode(snapshot.stats))
+    buf.append(',"summary":' + encode(make_summary(snapshot).strip()))
+    buf.append(',"dimensions":' + encode(sorted(snapshot.dimensions)) + '}')
+    chunk = ''.join(buf).encode('utf-8')
+    timer.pause()
+    timer.observe('/api/papers', 'json_encode')
+    yield chunk
+
+# 预先编码好的全量导出，按快照版本只保留一份。只由 wsgi.py 的主进程在 fork 前填充：
+# 工作进程直接发送共享的字节串，不必逐篇遍历论文 dict（遍历会改写引用计数，
+# 使整个语料所在的内存页在每个工作进程里各复制一份）
+_EXPORT_CACHE = {}
+
+def prepare_papers_export(snapshot):
+    data = b''.join(iter_papers_json(snapshot))
+    _EXPORT_CACHE.clear()
+    _EXPORT_CACHE[snapshot.version] = data
+    return data
+
+def api_papers_page(snapshot):
+    try:
+        limit = int_arg('limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        offset = int_arg('offset', 0, 0)
+    except ValueError:
+        return jsonify({"error": f"limit 取值 1-{MAX_PAGE_SIZE}，offset 需为非负整数"}), 400
+    backend = sqlite_backend(snapshot)
+    if backend is not None:
+        page, total = backend.page(offset, limit)
+    else:
+        total = len(snapshot.papers)
+        # 只序列化请求的这一页
+        page = snapshot.papers[offset:offset + limit]
+    return papers_response(snapshot, page, total, offset, limit)
+
+def list_arg(name):
+    return [item.strip() for item in request.args.get(name, '').split(',') if item.strip()]
+
+def filter_args():
+    """解析 dimension/year/ranking/type/max_tier 筛选参数，格式错误抛 ValueError"""
+    return {
+        "dimensions": list_arg('dimension'),
+        "years": [int(y) for y in list_arg('year')],
+        "rankings": list_arg('ranking'),
+        "types": list_arg('type'),
+        "max_tier": int_arg('max_tier', None, 1),
+    }
+
+def page_response(snapshot, indices, total, offset, limit, **extra):
+    return papers_response(snapshot, [snapshot.papers[i] for i in indices], total, offset, limit, **extra)
+
+def papers_response(snapshot, page, total, offset, limit, **extra):
+    fields = parse_fields(request.args.get('fields', ''))
+    if fields:
+        page = [project_paper(paper, fields) for paper in page]
+    next_offset = offset + limit if offset + limit < total else None
+    return jsonify({
+        "papers": page,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+        "version": snapshot.version,
+        **extra
+    })
+
+@app.route('/api/query')
+def api_query():
+    """服务端排序 + 筛选：使用快照里预计算的排序顺序和位图"""
+    snapshot = current_snapshot()
+    sort = request.args.get('sort', 'default')
+    if sort not in SORT_KEYS:
+        return jsonify({"error": "sort 可选值: " + ', '.join(SORT_KEYS)}), 400
+    try:
+        filters = filter_args()
+        limit = int_arg('limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        offset = int_arg('offset', 0, 0)
+    except ValueError:
+        return jsonify({"error": "year/max_tier/limit/offset 参数格式错误"}), 400
+    backend = sqlite_backend(snapshot)
+    if backend is not None:
+        # 筛选、排序和分页都在 SQLite 里完成
+        if request.args.get('format') == 'ids':
+            ids, total = backend.query_ids(sort, **filters)
+            return jsonify({"ids": ids, "total": total, "version": snapshot.version})
+        page, total = backend.query(sort, offset, limit, **filters)
+        return papers_response(snapshot, page, total, offset, limit, sort=sort)
+    mask = filter_mask(snapshot, **filters)
+    # 只要 id 时返回完整的有序列表，供前端重排已有卡片
+    if request.args.get('format') == 'ids':
+        indices, total = query(snapshot, sort, mask)
+        return jsonify({
+            "ids": [snapshot.paper_ids[i] for i in indices],
+            "total": total,
+            "version": snapshot.version
+        })
+    indices, total = query(snapshot, sort, mask, offset, limit)
+    return page_response(snapshot, indices, total, offset, limit, sort=sort)
+
+@app.route('/api/search')
+def api_search():
+    """全文检索（标题、摘要、标签、贡献、评估指标，以及已索引的 PDF 正文），BM25 排序"""
+    snapshot = current_snapshot()
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "缺少检索词 q"}), 400
+    try:
+        filters = filter_args()
+        limit = int_arg('limit', 20, 1, MAX_PAGE_SIZE)
+        offset = int_arg('offset', 0, 0)
+    except ValueError:
+        return jsonify({"error": "year/max_tier/limit/offset 参数格式错误"}), 400
+    backend = sqlite_backend(snapshot)
+    if backend is not None:
+        # FTS5 只覆盖标题和摘要，不含 PDF 正文
+        if request.args.get('format') == 'ids':
+            rows, total = backend.search(q, 0, None, columns="p.id", **filters)
+            return jsonify({"ids": [paper_id for paper_id, _ in rows], "total": total, "version": snapshot.version})
+        rows, total = backend.search(q, offset, limit, **filters)
+        return papers_response(snapshot, [paper for paper, _ in rows], total, offset, limit,
+                               q=q, scores=[round(score, 4) for _, score in rows])
+    mask = filter_mask(snapshot, **filters)
+    if request.args.get('format') == 'ids':
+        hits, total = search(snapshot, q, mask, 0, len(snapshot.papers), current_pdf_index())
+        return jsonify({
+            "ids": [snapshot.paper_ids[i] for i, _ in hits],
+            "total": total,
+            "version": snapshot.version
+        })
+    hits, total = search(snapshot, q, mask, offset, limit, current_pdf_index())
+    return page_response(snapshot, [i for i, _ in hits], total, offset, limit,
+                         q=q, scores=[round(score, 4) for _, score in hits])
+
+@app.route('/api/search/pdf')
+def api_search_pdf():
+    """PDF 正文检索：命中精确到页，附带引用该 PDF 的论文 id"""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "缺少检索词 q"}), 400
+    try:
+        limit = int_arg('limit', 20, 1, MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "limit 参数格式错误"}), 400
+    index = current_pdf_index()
+    if index is None:
+        return jsonify({"error": "PDF 索引未启用或尚在建立中"}), 503
+    hits, total = index.search(q, limit)
+    return jsonify({"q": q, "hits": hits, "total": total})
+
+# 作者接口的上限
+MAX_COLLABORATORS = 200
+MAX_NETWORK_HOPS = 3
+MAX_NETWORK_NODES = 500
+
+def author_summary(authors, author):
+    return {
+        "id": authors.keys[author],
+        "name": authors.names[author],
+        "papers": authors.paper_count(author),
+        "collaborators": authors.collaborator_count(author),
+    }
+
+@app.route('/api/authors')
+def api_authors():
+    """按名字查作者（忽略大小写、变音符号和标点），按论文数降序"""
+    snapshot = current_snapshot()
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "缺少作者名 q"}), 400
+    try:
+        limit = int_arg('limit', 20, 1, MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": f"limit 取值 1-{MAX_PAGE_SIZE}"}), 400
+    authors = snapshot.author_index
+    hits, total = authors.search(q, limit)
     return jsonify({
-        "papers": PAPERS_DATA, 
-        "stats": STATS, 
-        "summary": SUMMARY.strip(),
-        "dimensions": list(ALL_DIMENSIONS)
+        "q": q,
+        "authors": [author_summary(authors, author) for author in hits],
+        "total": total,
+        "version": snapshot.version
     })
 
+@app.route('/api/authors/<name>')
+def api_author(name):
+    """作者的论文（新的在前），支持 limit/offset/fields；name 可以是原始写法或规范化的 id"""
+    snapshot = current_snapshot()
+    authors = snapshot.author_index
+    author = authors.lookup(name)
+    if author is None:
+        return jsonify({"error": "作者不存在"}), 404
+    try:
+        limit = int_arg('limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        offset = int_arg('offset', 0, 0)
+    except ValueError:
+        return jsonify({"error": f"limit 取值 1-{MAX_PAGE_SIZE}，offset 需为非负整数"}), 400
+    indices = authors.papers(author)
+    return page_response(snapshot, indices[offset:offset + limit], len(indices), offset, limit,
+                         author=author_summary(authors, author))
+
+@app.route('/api/authors/<name>/collaborators')
+def api_author_collaborators(name):
+    """合著最多的作者，按合著篇数降序"""
+    snapshot = current_snapshot()
+    authors = snapshot.author_index
+    author = authors.lookup(name)
+    if author is None:
+        return jsonify({"error": "作者不存在"}), 404
+    try:
+        limit = int_arg('limit', 20, 1, MAX_COLLABORATORS)
+    except ValueError:
+        return jsonify({"error": f"limit 取值 1-{MAX_COLLABORATORS}"}), 400
+    return jsonify({
+        "author": author_summary(authors, author),
+        "collaborators": [
+            {"id": authors.keys[other], "name": authors.names[other], "shared_papers": count}
+            for other, count in authors.collaborators(author, limit)
+        ],
+        "version": snapshot.version
+    })
+
+@app.route('/api/authors/<name>/network')
+def api_author_network(name):
+    """hops 跳以内的合著网络：节点带距离，边带合著篇数；节点数不超过 limit"""
+    snapshot = current_snapshot()
+    authors = snapshot.author_index
+    author = authors.lookup(name)
+    if author is None:
+        return jsonify({"error": "作者不存在"}), 404
+    try:
+        hops = int_arg('hops', 2, 1, MAX_NETWORK_HOPS)
+        limit = int_arg('limit', 100, 1, MAX_NETWORK_NODES)
+    except ValueError:
+        return jsonify({"error": f"hops 取值 1-{MAX_NETWORK_HOPS}，limit 取值 1-{MAX_NETWORK_NODES}"}), 400
+    distance, edges = authors.neighborhood(author, hops, limit)
+    return jsonify({
+        "author": author_summary(authors, author),
+        "hops": hops,
+        "nodes": [
+            {"id": authors.keys[node], "name": authors.names[node], "distance": d}
+            for node, d in distance.items()
+        ],
+        "edges": [
+            {"source": authors.keys[a], "target": authors.keys[b], "shared_papers": weight}
+            for a, b, weight in edges
+        ],
+        "version": snapshot.version
+    })
+
+@app.route('/api/facets')
+def api_facets():
+    """在当前筛选条件下的年份 / 级别 / 类型 / 信任维度计数"""
+    snapshot = current_snapshot()
+    try:
+        filters = filter_args()
+        dim_limit = int_arg('dim_limit', 50, 1, 1000)
+    except ValueError:
+        return jsonify({"error": "year/max_tier/dim_limit 参数格式错误"}), 400
+    backend = sqlite_backend(snapshot)
+    if backend is not None:
+        facets = backend.facet_counts(dim_limit=dim_limit, **filters)
+    else:
+        facets = facet_counts(snapshot, dim_limit=dim_limit, **filters)
+    facets["version"] = snapshot.version
+    return jsonify(facets)
+
 if __name__ == '__main__':
     print("🐱 落先生的文献小窝 V2.0 启动啦！")
     print("📍 访问地址：http://localhost:5001")
+    # 开启 reloader 时只在真正服务请求的子进程里监听 papers.json
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_watcher()
+        start_pdf_indexer()
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""异步入口（ASGI）：大文件下载和全量导出不再占住同步工作线程
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+
+与 app.py 在同一进程里共享快照、索引、首页渲染缓存和指标。
+
+/download/<filename>、/ 和全量 /api/papers 由这里直接处理。文件分块在线程池里
+读取，await send() 自带背压：慢客户端只占一个协程和一块缓冲，不占线程。
+其余接口（分页、/api/query、/api/search、/api/facets、/metrics 等）在线程池里
+调用 Flask app，行为与同步部署完全一致。这些请求都是毫秒级的内存计算，
+异步化也不会更快。
+
+uvicorn 为可选依赖；本模块本身只用标准库，任何 ASGI 服务器都可以加载 asgi:app。
+"""
+
+import asyncio
+import io
+import mimetypes
+import os
+import sys
+import time
+from urllib.parse import parse_qs, quote
+
+from werkzeug.security import safe_join
+
+import app as flask_app
+from metrics import REQUESTS, REQUEST_LATENCY, RESPONSE_SIZE
+from paper_store import LITERATURE_DIR, current_snapshot, start_watcher, start_pdf_indexer
+
+# 下载时每次读取并发送的字节数
+FILE_CHUNK_SIZE = 256 * 1024
+
+def _headers(scope):
+    return {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+
+def _accepts(headers, encoding):
+    """Accept-Encoding 里是否接受该编码（q=0 视为不接受）"""
+    for item in headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() in (encoding, "*"):
+            params = params.replace(" ", "")
+            try:
+                return not params.startswith("q=") or float(params[2:] or 0) > 0
+            except ValueError:
+                return False
+    return False
+
+class Responder:
+    """发送响应并记录与 Flask 部分相同的请求指标"""
+
+    def __init__(self, scope, send, route):
+        self.send = send
+        self.route = route
+        self.method = scope["method"]
+        self.started = time.perf_counter()
+        self.size = 0
+
+    async def start(self, status, headers):
+        REQUESTS.inc(self.route, self.method, str(status))
+        await self.send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), str(v).encode("latin-1")) for k, v in headers],
+        })
+
+    async def body(self, data, more=False):
+        self.size += len(data)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more})
+        if not more:
+            REQUEST_LATENCY.observe(time.perf_counter() - self.started, self.route, self.method)
+            RESPONSE_SIZE.observe(self.size, self.route)
+
+    async def simple(self, status, data, content_type="text/plain; charset=utf-8", headers=()):
+        await self.start(status, [("Content-Type", content_type), ("Content-Length", len(data)), *headers])
+        await self.body(data if self.method != "HEAD" else b"")
+
+def parse_range(value, size):
+    """单段 Range: bytes=start-end，返回 (start, end) 闭区间；不满足时返回 None"""
+    if not value.startswith("bytes=") or "," in value:
+        return None
+    start, _, end = value[6:].strip().partition("-")
+    try:
+        if start == "":
+            length = int(end)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+def content_disposition(name):
+    try:
+        name.encode("ascii")
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(name)}"
+    return f'attachment; filename="{name}"' if any(c in name for c in ' ;,"') else f"attachment; filename={name}"
+
+async def download(scope, send, filename):
+    """异步分块发送 LITERATURE_DIR 下的文件，支持单段 Range 续传"""
+    responder = Responder(scope, send, "/download/<filename>")
+    path = safe_join(LITERATURE_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        await responder.simple(404, "文件不存在".encode("utf-8"))
+        return
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(None, open, path, "rb")
+    try:
+        size = os.fstat(f.fileno()).st_size
+        start, end = 0, size - 1
+        status = 200
+        headers = [
+            ("Content-Type", mimetypes.guess_type(filename)[0] or "application/octet-stream"),
+            ("Content-Disposition", content_disposition(os.path.basename(path))),
+            ("Accept-Ranges", "bytes"),
+        ]
+        requested = _headers(scope).get("range")
+        if requested and size:
+            byte_range = parse_range(requested, size)
+            if byte_range is None:
+                await responder.simple(416, b"", headers=[("Content-Range", f"bytes */{size}")])
+                return
+            start, end = byte_range
+            status = 206
+            headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+        headers.append(("Content-Length", end - start + 1 if size else 0))
+        await responder.start(status, headers)
+        if scope["method"] == "HEAD" or not size:
+            await responder.body(b"")
+            return
+        await loop.run_in_executor(None, f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await loop.run_in_executor(None, f.read, min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await responder.body(chunk, more=remaining > 0)
+        if remaining > 0:
+            # 文件在发送过程中被截短
+            await responder.body(b"")
+    finally:
+        f.close()
+
+async def index(scope, send):
+    """首页：命中渲染缓存时直接发送预压缩的结果，未命中时等待共享的那一次渲染"""
+    responder = Responder(scope, send, "/")
+    snapshot = current_snapshot()
+    entry = flask_app._RENDER_CACHE.get(flask_app.index_cache_key(snapshot))
+    if entry is None:
+        # 同一个键只渲染一次，并发请求等待同一个 future，不占线程池
+        entry, pending = flask_app.start_render(snapshot, flask_app.index_cache_key(snapshot))
+        if entry is None:
+            entry = await asyncio.wrap_future(pending.future)
+    headers = _headers(scope)
+    encoding = "identity"
+    for candidate in ("br", "gzip"):
+        if candidate in entry and _accepts(headers, candidate):
+            encoding = candidate
+            break
+    etag = f'"{entry["etag"]}-{encoding}"'
+    extra = [("ETag", etag), ("Vary", "Accept-Encoding")]
+    if encoding != "identity":
+        extra.append(("Content-Encoding", encoding))
+    if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+        await responder.start(304, extra)
+        await responder.body(b"")
+        return
+    await responder.simple(200, entry[encoding], "text/html; charset=utf-8", extra)
+
+async def export_papers(scope, send):
+    """全量导出：有预编码结果就直接发送，否则在线程池里逐块编码"""
+    responder = Responder(scope, send, "/api/papers")
+    snapshot = current_snapshot()
+    data = flask_app._EXPORT_CACHE.get(snapshot.version)
+    if data is not None:
+        await responder.simple(200, data, "application/json")
+        return
+    await responder.start(200, [("Content-Type", "application/json")])
+    if scope["method"] == "HEAD":
+        await responder.body(b"")
+        return
+    loop = asyncio.get_running_loop()
+    chunks = flask_app.iter_papers_json(snapshot)
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            break
+        await responder.body(chunk, more=True)
+    await responder.body(b"")
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body.extend(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return bytes(body)
+
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for key, value in scope["headers"]:
+        name = key.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        name = "HTTP_" + name
+        environ[name] = environ[name] + "," + value if name in environ else value
+    return environ
+
+def call_wsgi(environ):
+    """在线程池里执行 Flask app，返回 (状态码, 响应头, 响应体)"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = headers
+        return lambda data: None
+
+    iterable = flask_app.app.wsgi_app(environ, start_response)
+    try:
+        body = b"".join(iterable)
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+    return started["status"], started["headers"], body
+
+async def fallback(scope, receive, send):
+    body = await read_body(receive)
+    status, headers, data = await asyncio.get_running_loop().run_in_executor(
+        None, call_wsgi, wsgi_environ(scope, body))
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    await send({"type": "http.response.body", "body": data})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            start_watcher()
+            start_pdf_indexer()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    path = scope["path"]
+    if scope["method"] in ("GET", "HEAD"):
+        # 与 Flask 的 <filename> 一致：不含 '/'
+        if path.startswith("/download/") and len(path) > len("/download/") and "/" not in path[len("/download/"):]:
+            await download(scope, send, path[len("/download/"):])
+            return
+        if path == "/":
+            await index(scope, send)
+            return
+        if path == "/api/papers":
+            args = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+            # 带分页参数的请求与其余 API 一样交给 Flask
+            if not any(name in args for name in flask_app.PAGINATION_ARGS):
+                await export_papers(scope, send)
+                return
+    await fallback(scope, receive, send)
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("需要先安装 uvicorn，或用其他 ASGI 服务器加载 asgi:app")
+    print("🐱 落先生的文献小窝（异步）启动啦！")
+    print("📍 访问地址：http://localhost:5001")
+    uvicorn.run(app, host="0.0.0.0", port=5001)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""作者索引：规范化作者名 -> 论文列表，以及合著关系图
+
+作者名规范化后作为键："I. Šimić"、"I. Simic"、"i.  simic" 都是 i-simic。
+只按拼写合并，不做同名消歧：同一个人写法不同（缩写与全名）时仍是两个键。
+
+合著图以 CSR 形式存储：每个作者的合作者按合著篇数降序排好，
+"最常合作的作者"只是取一段数组，k 跳邻域是在它上面做的有界 BFS。
+"""
+
+import unicodedata
+from array import array
+from collections import Counter, deque
+
+# 作者数超过此值的论文（大型合作项目）不计入合著图，避免 O(作者数^2) 条边
+MAX_COAUTHORS_PER_PAPER = 100
+
+def normalize_author(name):
+    """去掉变音符号、标点，转小写，用 '-' 连接各部分"""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = "".join(c if c.isalnum() else " " for c in text)
+    return "-".join(text.split())
+
+class AuthorIndex:
+    """构建后只读；作者用整数编号，keys[i] 为规范化键，names[i] 为最常见的原始写法"""
+
+    def __init__(self, papers):
+        ids = {}
+        spellings = []
+        members = []
+        paper_authors = []
+        for i, paper in enumerate(papers):
+            authors = []
+            for name in paper.get("authors") or []:
+                if not isinstance(name, str):
+                    continue
+                key = normalize_author(name)
+                if not key:
+                    continue
+                author = ids.get(key)
+                if author is None:
+                    author = ids[key] = len(spellings)
+                    spellings.append(Counter())
+                    members.append([])
+                spellings[author][name.strip()] += 1
+                if author not in authors:
+                    authors.append(author)
+                    members[author].append(i)
+            paper_authors.append(authors)
+
+        self.ids = ids
+        self.keys = [None] * len(ids)
+        for key, author in ids.items():
+            self.keys[author] = key
+        self.names = [counts.most_common(1)[0][0] for counts in spellings]
+
+        # 每位作者的论文：新的在前
+        def year(i):
+            value = papers[i].get("year")
+            return value if isinstance(value, int) else 0
+        self.paper_offsets = array("i", [0])
+        self.paper_indices = array("i")
+        for indices in members:
+            self.paper_indices.extend(sorted(indices, key=lambda i: (-year(i), i)))
+            self.paper_offsets.append(len(self.paper_indices))
+
+        # 合著篇数
+        weights = [Counter() for _ in members]
+        for authors in paper_authors:
+            if len(authors) > MAX_COAUTHORS_PER_PAPER:
+                continue
+            for a in authors:
+                for b in authors:
+                    if a != b:
+                        weights[a][b] += 1
+        # 第 a 位作者的合作者在 coauthor_offsets[a]:coauthor_offsets[a+1]，按篇数降序、同数按名字
+        self.coauthor_offsets = array("i", [0])
+        self.coauthors = array("i")
+        self.coauthor_weights = array("i")
+        for counts in weights:
+            for b, count in sorted(counts.items(), key=lambda item: (-item[1], self.keys[item[0]])):
+                self.coauthors.append(b)
+                self.coauthor_weights.append(count)
+            self.coauthor_offsets.append(len(self.coauthors))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, name):
+        """按原始写法或规范化键找作者编号，找不到返回 None"""
+        return self.ids.get(normalize_author(name))
+
+    def search(self, query, limit):
+        """键包含查询词各部分的作者，按论文数降序；返回 ([编号], 总数)"""
+        parts = normalize_author(query).split("-")
+        if not parts or not parts[0]:
+            return [], 0
+        hits = [author for author, key in enumerate(self.keys)
+                if all(part in key for part in parts)]
+        hits.sort(key=lambda author: (-self.paper_count(author), self.keys[author]))
+        return hits[:limit], len(hits)
+
+    def paper_count(self, author):
+        return self.paper_offsets[author + 1] - self.paper_offsets[author]
+
+    def papers(self, author):
+        return self.paper_indices[self.paper_offsets[author]:self.paper_offsets[author + 1]]
+
+    def collaborators(self, author, limit=None):
+        """[(合作者编号, 合著篇数)]，按篇数降序"""
+        start, end = self.coauthor_offsets[author], self.coauthor_offsets[author + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return list(zip(self.coauthors[start:end], self.coauthor_weights[start:end]))
+
+    def collaborator_count(self, author):
+        return self.coauthor_offsets[author + 1] - self.coauthor_offsets[author]
+
+    def neighborhood(self, author, hops, limit):
+        """k 跳以内的合著网络：返回 ({编号: 距离}, [(a, b, 篇数)])
+
+        BFS 按合著篇数从多到少展开，节点数达到 limit 即停止；
+        边只包含两端都在结果里的，每条边只出现一次。
+        """
+        distance = {author: 0}
+        queue = deque([author])
+        while queue and len(distance) < limit:
+            current = queue.popleft()
+            if distance[current] >= hops:
+                continue
+            start, end = self.coauthor_offsets[current], self.coauthor_offsets[current + 1]
+            for neighbor in self.coauthors[start:end]:
+                if neighbor not in distance:
+                    distance[neighbor] = distance[current] + 1
+                    queue.append(neighbor)
+                    if len(distance) >= limit:
+                        break
+        edges = []
+        for a in distance:
+            start, end = self.coauthor_offsets[a], self.coauthor_offsets[a + 1]
+            for b, weight in zip(self.coauthors[start:end], self.coauthor_weights[start:end]):
+                if a < b and b in distance:
+                    edges.append((a, b, weight))
+        return distance, edges
+
+if __name__ == "__main__":
+    import sys
+
+    import paper_store
+
+    papers, _ = paper_store.load_papers(sys.argv[1] if len(sys.argv) > 1 else None)
+    index = AuthorIndex(papers)
+    print(f"👥 作者 {len(index)} 位，合著关系 {len(index.coauthors) // 2} 对")
+    top = sorted(range(len(index)), key=lambda a: -index.paper_count(a))[:10]
+    for author in top:
+        partners = ", ".join(f"{index.names[b]}({n})" for b, n in index.collaborators(author, 3))
+        print(f"  {index.names[author]:<24} {index.paper_count(author):>3} 篇  {partners}")
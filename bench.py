@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""基准测试：加载、首页渲染与 /api/papers 在不同语料规模下的耗时、峰值内存和响应大小
+
+    python bench.py                       # 500 / 5k / 50k / 500k，结果写到 bench_results/<commit>.json
+    python bench.py --sizes 500,5000 -o before.json
+    python bench.py --compare before.json after.json
+
+语料由 generate_corpus 按现有 papers.json 的结构合成（作者、journal_info、
+trust_dimensions、bibtex、中英混合摘要），同一 seed 生成的文件逐字节相同。
+每个测量项在独立子进程里运行，峰值 RSS 互不干扰；500k 篇的语料约 1 GB，
+构建快照需要数 GB 内存。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+DEFAULT_SIZES = (500, 5000, 50000, 500000)
+# 每个子进程的超时（秒）
+CASE_TIMEOUT = 3600
+# 热路径重复次数，取最小值
+REPEAT = 5
+
+CASES = ("load_papers", "build_snapshot", "related_index", "index", "api_papers", "api_papers_page")
+
+_RANKINGS = (
+    ("SCI Q1", "SCI Q1期刊", 0.25), ("SCI Q2", "SCI Q2期刊", 0.25), ("SCI Q3", "SCI Q3期刊", 0.2),
+    ("CCF-A", "CCF-A会议", 0.05), ("CCF-B", "CCF-B会议", 0.05), ("EI", "EI会议", 0.15), ("N/A", "其他", 0.05),
+)
+_PUBLISHERS = ("IEEE", "ACM", "Springer", "Elsevier", "MDPI", "Wiley", "arXiv")
+_VENUES = ("IEEE Trans. Ind. Inform.", "ACM Comput. Surv.", "Computing", "Inf. Sci.", "IEEE Access",
+           "Future Gener. Comput. Syst.", "J. Syst. Softw.", "Proc. CCS", "Proc. WWW", "Sensors")
+_SURNAMES = ("Wang", "Li", "Zhang", "Chen", "Liu", "Smith", "Noor", "Sheng", "Yao", "Müller", "Kim", "Singh")
+_WORDS = ("trust", "evaluation", "framework", "reputation", "cloud", "service", "security", "privacy",
+          "model", "assessment", "blockchain", "federated", "learning", "network", "system", "reliability",
+          "explainable", "ai", "iot", "edge", "zero", "architecture", "verification", "quantitative",
+          "dynamic", "multi", "dimensional", "fuzzy", "bayesian", "graph", "attack", "detection")
+_CJK_PHRASES = ("信任评估", "可信度", "声誉管理", "云服务", "零信任架构", "软件供应链", "隐私保护", "安全性",
+                "可靠性", "多维信任", "人工智能", "联邦学习", "区块链", "物联网", "攻击检测", "量化模型",
+                "动态信任", "服务等级协议", "可解释性", "风险分析", "实验验证", "框架设计")
+_DIMENSIONS = {
+    "security": "安全性", "privacy": "隐私", "reliability": "可靠性", "reputation": "声誉",
+    "transparency": "透明性", "explainability": "可解释性", "fairness": "公平性", "robustness": "鲁棒性",
+    "accountability": "问责", "availability": "可用性", "integrity": "完整性", "safety": "安全保障",
+    "self_assessment": "自评估", "cloud_audit": "云审计", "service_level_agreement": "服务等级协议",
+    "sensor_trust": "传感器可信度", "data_quality": "数据质量", "provenance": "溯源",
+    "malicious_detection": "恶意检测", "user_perception": "用户感知", "compliance": "合规性",
+    "interoperability": "互操作性", "maintainability": "可维护性", "resilience": "韧性",
+}
+_METRICS = ("信任评分", "声誉值", "准确率", "召回率", "F1", "AUC", "延迟", "吞吐量", "SLA合规率")
+
+def _sentence(rng):
+    parts = [rng.choice(_CJK_PHRASES) for _ in range(rng.randint(2, 4))]
+    words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3)))
+    return f"本文研究{parts[0]}中的{words}问题，结合{'、'.join(parts[1:])}提出新的方法。"
+
+def generate_paper(rng, n):
+    year = rng.randint(2015, 2025)
+    ranking, journal_type = rng.choices([(r, t) for r, t, _ in _RANKINGS], [w for *_, w in _RANKINGS])[0]
+    title_words = [rng.choice(_WORDS).capitalize() for _ in range(rng.randint(4, 9))]
+    title = " ".join(title_words)
+    authors = [f"{chr(65 + rng.randrange(26))}. {rng.choice(_SURNAMES)}" for _ in range(rng.randint(1, 6))]
+    publisher = rng.choice(_PUBLISHERS)
+    venue = rng.choice(_VENUES)
+    doi = f"10.{rng.randint(1000, 9999)}/{rng.choice(_WORDS)}.{year}.{n:06d}"
+    impact_factor = round(rng.uniform(0.5, 12.0), 1) if rng.random() < 0.85 else "N/A"
+    dimensions = dict(rng.sample(sorted(_DIMENSIONS.items()), rng.randint(2, 6)))
+    key = f"{authors[0].split()[-1].lower()}{year}{title_words[0].lower()}"
+    return {
+        "id": f"synthetic_{n:07d}_{year}",
+        "title": title,
+        "authors": authors,
+        "year": year,
+        "venue": venue,
+        "institution": publisher,
+        "file": None,
+        "size": "N/A",
+        "abstract": "".join(_sentence(rng) for _ in range(rng.randint(2, 5))),
+        "key_contributions": rng.sample(_CJK_PHRASES, 3),
+        "trust_dimensions": dimensions,
+        "evaluation_method": {
+            "approach": rng.choice(_CJK_PHRASES),
+            "metrics": rng.sample(_METRICS, rng.randint(1, 4)),
+            "framework": rng.choice(_CJK_PHRASES) + "框架",
+        },
+        "bibtex": (f"@article{{{key}, author={{{' and '.join(authors)}}}, title={{{title}}}, "
+                   f"journal={{{venue}}}, year={{{year}}}, doi={{{doi}}}}}"),
+        "tags": rng.sample(_CJK_PHRASES, 3),
+        "journal_info": {
+            "type": journal_type,
+            "ranking": ranking,
+            "publisher": publisher,
+            "access_url": f"https://doi.org/{doi}",
+            "doi": doi,
+            "impact_factor": impact_factor,
+            "impact_factor_label": f"IF: {impact_factor}",
+            "notes": rng.choice(_CJK_PHRASES),
+            "file_path": "pdf/trust_iot_framework.pdf" if rng.random() < 0.5 else None,
+        },
+    }
+
+def generate_corpus(path, size, seed=0):
+    """流式写出 size 篇合成论文（不在内存里保留整个语料），返回文件字节数"""
+    from dedup_papers import corpus_statistics
+
+    rng = random.Random(seed)
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=None)
+    stats = {"total_papers": 0, "q1": 0, "q2": 0, "q3": 0, "ei": 0}
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write('{"title": "合成基准语料", "description": "bench.py 生成", "papers": [\n')
+        for n in range(size):
+            paper = generate_paper(rng, n)
+            for key, value in corpus_statistics([paper]).items():
+                stats[key] += value
+            f.write(("" if n == 0 else ",\n") + encoder.encode(paper))
+        f.write('\n], "statistics": ' + encoder.encode(stats) + "}\n")
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+def peak_rss():
+    """进程峰值 RSS（字节）；Linux 的 ru_maxrss 单位是 KiB，macOS 是字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None or elapsed < best else best
+    return best, result
+
+def run_case(case, corpus_dir, repeat=REPEAT):
+    """在当前（子）进程里测一个路径，返回结果 dict"""
+    path = os.path.join(corpus_dir, "papers.json")
+    result = {"case": case}
+    if case in ("load_papers", "build_snapshot", "related_index"):
+        # 指向空目录，import 时不会先建一遍快照；缓存关闭，测的是冷路径
+        os.environ["CLAWPAPER_DIR"] = os.path.join(corpus_dir, "empty")
+        os.environ["CLAWPAPER_SNAPSHOT_CACHE"] = ""
+        os.makedirs(os.environ["CLAWPAPER_DIR"], exist_ok=True)
+        import paper_store
+        if case == "related_index":
+            # 只测按需构建的相关论文索引，基线内存包含已建好的快照
+            snapshot = paper_store.build_snapshot(path)
+        result["baseline_rss_bytes"] = peak_rss()
+        started = time.perf_counter()
+        if case == "load_papers":
+            papers, _ = paper_store.load_papers(path)
+            result["papers"] = len(papers)
+        elif case == "build_snapshot":
+            snapshot = paper_store.build_snapshot(path)
+            result["papers"] = len(snapshot.papers)
+        else:
+            related = snapshot.related
+            result["papers"] = len(snapshot.papers)
+        result["wall_s"] = time.perf_counter() - started
+        if case == "related_index":
+            # 邻居下标与分数两个数组的大小
+            result["response_bytes"] = len(related.neighbors) * (related.neighbors.itemsize + related.scores.itemsize)
+        else:
+            result["response_bytes"] = os.path.getsize(path)
+        result["peak_rss_bytes"] = peak_rss()
+        return result
+
+    os.environ["CLAWPAPER_DIR"] = corpus_dir
+    os.environ["CLAWPAPER_SNAPSHOT_CACHE"] = os.path.join(corpus_dir, "snapshot_cache")
+    started = time.perf_counter()
+    import app as app_module
+    result["startup_s"] = time.perf_counter() - started
+    result["baseline_rss_bytes"] = peak_rss()
+    client = app_module.app.test_client()
+    identity = {"Accept-Encoding": "identity"}
+
+    if case == "index":
+        # 首次请求：渲染缓存未命中，流式渲染整页
+        started = time.perf_counter()
+        body = client.get("/", headers=identity).get_data()
+        result["cold_wall_s"] = time.perf_counter() - started
+        key = app_module.index_cache_key(app_module.current_snapshot())
+        deadline = time.monotonic() + 600
+        while app_module._RENDER_CACHE.get(key) is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        result["wall_s"], _ = _best_of(lambda: client.get("/", headers=identity).get_data(), repeat)
+        gzip_body = client.get("/", headers={"Accept-Encoding": "gzip"}).get_data()
+        result["response_bytes"] = len(body)
+        result["gzip_bytes"] = len(gzip_body)
+    elif case == "api_papers":
+        result["wall_s"], body = _best_of(lambda: client.get("/api/papers").get_data(), repeat)
+        result["response_bytes"] = len(body)
+    elif case == "api_papers_page":
+        result["wall_s"], body = _best_of(lambda: client.get("/api/papers?limit=50&offset=100").get_data(), repeat)
+        result["response_bytes"] = len(body)
+    else:
+        raise ValueError(f"未知的测量项: {case}")
+    result["papers"] = len(app_module.current_snapshot().papers)
+    result["peak_rss_bytes"] = peak_rss()
+    return result
+
+def run_in_subprocess(case, corpus_dir, repeat):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", case, corpus_dir, "--repeat", str(repeat)]
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=CASE_TIMEOUT, env=env)
+    except subprocess.TimeoutExpired:
+        return {"case": case, "error": f"超时 ({CASE_TIMEOUT}s)"}
+    if proc.returncode != 0:
+        return {"case": case, "error": (proc.stderr.strip().splitlines() or [f"退出码 {proc.returncode}"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_suite(sizes, work_dir, cases=CASES, repeat=REPEAT, seed=0):
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+    for size in sizes:
+        corpus_dir = os.path.join(work_dir, f"n{size}")
+        os.makedirs(corpus_dir, exist_ok=True)
+        path = os.path.join(corpus_dir, "papers.json")
+        # 同一 seed 生成的语料相同，已存在就复用
+        if not os.path.exists(path):
+            started = time.perf_counter()
+            generate_corpus(path, size, seed)
+            print(f"🧪 生成 {size} 篇: {os.path.getsize(path) / 1e6:.1f} MB, {time.perf_counter() - started:.1f}s",
+                  file=sys.stderr)
+        for case in cases:
+            result = run_in_subprocess(case, corpus_dir, repeat)
+            result["size"] = size
+            report["results"].append(result)
+            print(format_result(result), file=sys.stderr)
+    return report
+
+def format_result(result):
+    if "error" in result:
+        return f"  {result['size']:>7} {result['case']:<16} ❌ {result['error']}"
+    extra = f"  cold {result['cold_wall_s']:.3f}s" if "cold_wall_s" in result else ""
+    return (f"  {result['size']:>7} {result['case']:<16} {result['wall_s']:8.3f}s  "
+            f"RSS {result['peak_rss_bytes'] / 2**20:8.1f} MiB  {result['response_bytes'] / 1e6:8.2f} MB{extra}")
+
+def compare(old_path, new_path):
+    """逐项打印两份结果的耗时、峰值内存比值（new / old）"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    before = {(r["size"], r["case"]): r for r in old["results"] if "error" not in r}
+    print(f"{old['commit']} -> {new['commit']}")
+    for result in new["results"]:
+        base = before.get((result["size"], result["case"]))
+        if base is None or "error" in result:
+            continue
+        print(f"  {result['size']:>7} {result['case']:<16} time x{result['wall_s'] / base['wall_s']:.2f}  "
+              f"RSS x{result['peak_rss_bytes'] / base['peak_rss_bytes']:.2f}  "
+              f"size x{result['response_bytes'] / max(base['response_bytes'], 1):.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="加载 / 首页 / API 路径的基准测试")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="逗号分隔的语料规模")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--work-dir", default=os.path.join("bench_results", "corpora"), help="合成语料存放目录")
+    parser.add_argument("-o", "--output", help="结果 JSON，默认 bench_results/<commit>.json")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "CORPUS_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], args.child[1], args.repeat)))
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    cases = [c for c in args.cases.split(",") if c.strip()]
+    report = run_suite(sizes, os.path.abspath(args.work_dir), cases, args.repeat, args.seed)
+    output = args.output or os.path.join("bench_results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📝 结果: {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
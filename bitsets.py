@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""用 Python int 表示的论文位图：第 i 位对应快照中第 i 篇论文"""
+
+def bitset_from_indices(indices, size):
+    """先在 bytearray 上置位，再一次性转换，避免大整数反复拷贝"""
+    buf = bytearray((size + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+def bitset_bytes(mask, size):
+    """位图转成 bytes，便于按下标 O(1) 测试"""
+    return mask.to_bytes((size + 7) // 8, "little")
+
+def bitset_indices(mask, size):
+    """按升序列出位图中的下标"""
+    members = bitset_bytes(mask, size)
+    result = []
+    for byte_index, byte in enumerate(members):
+        while byte:
+            low = byte & -byte
+            result.append((byte_index << 3) + low.bit_length() - 1)
+            byte ^= low
+    return result
+
+def union(masks):
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""紧凑的论文内存表示（可选，CLAWPAPER_COMPACT=1 时启用）
+
+- 每篇论文是一个 __slots__ 记录，只保存键顺序和值元组
+- 短字符串（作者、出版社、级别、维度键……）全部 intern；结构相同的
+  journal_info / trust_dimensions 等嵌套对象只保留一份
+- abstract、bibtex 这类长文本按块压缩，访问时才解压
+
+CompactStore 实现了序列接口，下标访问返回临时构建的 dict，因此快照和索引
+代码不需要区分两种表示。
+
+    python compact_store.py papers_filtered.json [--scale 50]
+
+会打印 dict-of-dicts 与紧凑表示的内存对比。
+"""
+
+import json
+import sys
+import threading
+import zlib
+from collections.abc import Sequence
+
+# 懒加载的长文本字段
+LAZY_FIELDS = ("abstract", "bibtex")
+# 超过该长度的字符串不 intern
+INTERN_MAX_LENGTH = 128
+# 每块压缩的文本条数
+TEXT_BLOCK_SIZE = 64
+# 保留的已解压块数
+TEXT_BLOCK_CACHE = 8
+
+class _FrozenDict:
+    """不可变的嵌套 dict，结构相同的实例全局共享"""
+    __slots__ = ("keys", "values")
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+class _LazyText:
+    """指向压缩文本块中的一条"""
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+class CompactPaper:
+    __slots__ = ("keys", "values")
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+class _TextBlocks:
+    """按块 zlib 压缩的文本，解压结果保留一个小 LRU"""
+
+    def __init__(self):
+        self.blocks = []
+        self._pending = []
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def add(self, text):
+        index = len(self.blocks) * TEXT_BLOCK_SIZE + len(self._pending)
+        self._pending.append(text)
+        if len(self._pending) >= TEXT_BLOCK_SIZE:
+            self.flush()
+        return index
+
+    def flush(self):
+        if self._pending:
+            raw = json.dumps(self._pending, ensure_ascii=False).encode("utf-8")
+            self.blocks.append(zlib.compress(raw, 6))
+            self._pending = []
+
+    def get(self, index):
+        block_no, offset = divmod(index, TEXT_BLOCK_SIZE)
+        texts = self._cache.get(block_no)
+        if texts is None:
+            texts = json.loads(zlib.decompress(self.blocks[block_no]))
+            with self._lock:
+                if len(self._cache) >= TEXT_BLOCK_CACHE:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[block_no] = texts
+        return texts[offset]
+
+    def __getstate__(self):
+        return {"blocks": self.blocks}
+
+    def __setstate__(self, state):
+        self.blocks = state["blocks"]
+        self._pending = []
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def nbytes(self):
+        return sum(len(b) for b in self.blocks)
+
+class CompactStore(Sequence):
+    """紧凑论文集合；store[i] 返回与原始 JSON 一致的 dict"""
+
+    def __init__(self, papers=()):
+        self._records = []
+        self._texts = _TextBlocks()
+        self._shared = {}
+        for paper in papers:
+            self._records.append(self._compact_paper(paper))
+        self._texts.flush()
+        # 构建完成后不再需要去重表
+        self._shared = None
+
+    def _freeze(self, value):
+        if isinstance(value, str):
+            return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+        if isinstance(value, list):
+            return self._share(tuple(self._freeze(v) for v in value))
+        if isinstance(value, dict):
+            keys = self._share(tuple(sys.intern(k) for k in value))
+            values = self._share(tuple(self._freeze(v) for v in value.values()))
+            return self._share_dict(keys, values)
+        return value
+
+    @staticmethod
+    def _identity(items):
+        """去重键：标量带上类型（避免 1 / 1.0 / True 被合并），子结构已共享故用 id"""
+        return tuple(id(v) if isinstance(v, (tuple, _FrozenDict)) else (type(v), v) for v in items)
+
+    def _share(self, frozen):
+        return self._shared.setdefault(("tuple", self._identity(frozen)), frozen)
+
+    def _share_dict(self, keys, values):
+        key = ("dict", id(keys), self._identity(values))
+        shared = self._shared.get(key)
+        if shared is None:
+            shared = self._shared[key] = _FrozenDict(keys, values)
+        return shared
+
+    def _compact_paper(self, paper):
+        keys = self._share(tuple(sys.intern(k) for k in paper))
+        values = []
+        for key, value in paper.items():
+            if key in LAZY_FIELDS and isinstance(value, str):
+                values.append(_LazyText(self._texts.add(value)))
+            else:
+                values.append(self._freeze(value))
+        return CompactPaper(keys, tuple(values))
+
+    def _thaw(self, value):
+        if isinstance(value, _FrozenDict):
+            return {k: self._thaw(v) for k, v in zip(value.keys, value.values)}
+        if isinstance(value, tuple):
+            return [self._thaw(v) for v in value]
+        if isinstance(value, _LazyText):
+            return self._texts.get(value.index)
+        return value
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._records)))]
+        record = self._records[index]
+        return {k: self._thaw(v) for k, v in zip(record.keys, record.values)}
+
+    def field(self, index, key, default=None):
+        """只取单个字段，不构建整篇 dict"""
+        record = self._records[index]
+        for k, v in zip(record.keys, record.values):
+            if k == key:
+                return self._thaw(v)
+        return default
+
+    def compressed_text_bytes(self):
+        return self._texts.nbytes()
+
+def measure(path, scale=1):
+    """用 tracemalloc 对比两种表示的常驻内存（字节）"""
+    import gc
+    import tracemalloc
+
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+
+    def load_dicts():
+        papers = json.loads(raw).get("papers", [])
+        if scale > 1:
+            # 放大语料时改写 id/标题/摘要，避免副本被 intern 或去重后低估内存
+            base = papers
+            papers = []
+            for n in range(scale):
+                for paper in json.loads(json.dumps(base)):
+                    paper["id"] = f"{paper.get('id')}_{n}"
+                    paper["title"] = f"{paper.get('title')} ({n})"
+                    paper["abstract"] = f"[{n}] " + (paper.get("abstract") or "")
+                    papers.append(paper)
+        return papers
+
+    gc.collect()
+    tracemalloc.start()
+    papers = load_dicts()
+    gc.collect()
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del papers
+    gc.collect()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    papers = load_dicts()
+    store = CompactStore(papers)
+    del papers
+    gc.collect()
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "papers": len(store),
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "compressed_text_bytes": store.compressed_text_bytes(),
+        "ratio": round(compact_bytes / dict_bytes, 3) if dict_bytes else None,
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="对比 dict-of-dicts 与紧凑表示的内存占用")
+    parser.add_argument("path", nargs="?", default="papers.json")
+    parser.add_argument("--scale", type=int, default=1, help="把语料复制放大若干倍后再测")
+    args = parser.parse_args()
+    result = measure(args.path, args.scale)
+    print(f"📚 论文数: {result['papers']}")
+    print(f"🧱 dict-of-dicts: {result['dict_bytes'] / 1024 / 1024:.2f} MiB")
+    print(f"📦 紧凑表示:      {result['compact_bytes'] / 1024 / 1024:.2f} MiB "
+          f"(其中压缩文本 {result['compressed_text_bytes'] / 1024 / 1024:.2f} MiB)")
+    print(f"📉 比例: {result['ratio']}")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""容错的流式语料加载器
+
+按块读取 {"papers": [...], "statistics": {...}} 格式的文件，逐条切出 papers
+数组里的记录再单独解码：某条记录损坏时只跳过这一条，并记下它的字节偏移，
+其余记录照常加载。缓冲区只保留当前记录，内存占用与文件大小无关。
+
+记录边界按花括号配对确定（字符串内的括号不计入），字符串不允许跨行，
+因此格式化过的文件里一个未闭合的引号最多影响到行尾。
+
+    python corpus_loader.py papers_full.json
+
+会打印可加载的记录数和每条错误的位置。
+"""
+
+import codecs
+import json
+import re
+
+# 每次从文件读取的字节数
+CHUNK_SIZE = 1 << 20
+# 单个值的上限；括号始终配不上时不会把整个文件读进缓冲区
+MAX_VALUE_BYTES = 16 << 20
+
+_NON_WS_RE = re.compile(r"\S")
+# 完整的 JSON 字符串（不跨行）或一个括号
+_STRUCT_RE = re.compile(r'"(?:[^"\\\n]|\\.)*"|[{}\[\]]')
+# 标量值：数字、true/false/null
+_SCALAR_RE = re.compile(r"[^\s,\]}]+")
+_RESYNC_RE = re.compile(r"[{\]]")
+# 非法 UTF-8 字节按 surrogateescape 解码后落在这个区间
+_BAD_BYTES_RE = re.compile("[\udc80-\udcff]")
+_DECODER = json.JSONDecoder()
+
+class TruncatedError(ValueError):
+    """文件在文档结束前就读完了"""
+
+class RecordError(ValueError):
+    """某个值本身损坏；offset 为该值起始的字节偏移"""
+
+    def __init__(self, offset, message):
+        super().__init__(message)
+        self.offset = offset
+
+class Corpus:
+    """加载结果：papers、statistics、跳过的记录，以及文档是否完整读完"""
+
+    def __init__(self):
+        self.papers = []
+        self.stats = {}
+        self.errors = []
+        self.complete = False
+
+    def add_error(self, offset, message):
+        self.errors.append({"offset": offset, "error": message})
+
+def _byte_length(text):
+    return len(text.encode("utf-8", "surrogateescape"))
+
+class _Reader:
+    """在文件上维护一个已解码的滑动缓冲区；offset 为 buf[0] 在文件中的字节偏移
+
+    正常记录直接交给 C 实现的 raw_decode；解码失败时才按括号配对找出记录边界，
+    从而只跳过这一条。
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        # surrogateescape 保证解码后再编码得到原始字节，偏移不会漂移
+        self.decoder = codecs.getincrementaldecoder("utf-8")("surrogateescape")
+        self.buf = ""
+        self.offset = 0
+        self.pos = 0
+        self.eof = False
+        self.bad_bytes = False
+
+    def tell(self, pos=None):
+        """缓冲区下标对应的文件字节偏移"""
+        return self.offset + _byte_length(self.buf[:self.pos if pos is None else pos])
+
+    def fill(self):
+        """丢弃已消费的内容并追加一块，返回是否读到了新数据"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        text = self.decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            self.eof = True
+            if not text:
+                return False
+        if not self.bad_bytes and _BAD_BYTES_RE.search(text):
+            self.bad_bytes = True
+        self.offset += _byte_length(self.buf[:self.pos])
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符，读完返回 ''"""
+        while True:
+            m = _NON_WS_RE.search(self.buf, self.pos)
+            if m:
+                self.pos = m.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self.fill():
+                return ""
+
+    def expect(self, token):
+        if self.peek() != token:
+            raise ValueError(f"偏移 {self.tell()} 处应为 {token}")
+        self.pos += 1
+
+    def read_value(self):
+        """读取下一个完整的 JSON 值
+
+        值本身损坏时抛 RecordError（已越过该值，可以继续读下一个）；
+        读到文件末尾仍未闭合时抛 TruncatedError。字节偏移只在出错时才计算。
+        """
+        if not self.peek():
+            raise TruncatedError(f"文件在偏移 {self.tell()} 处意外结束")
+        start = self.pos
+        try:
+            value, end = _DECODER.raw_decode(self.buf, start)
+        except json.JSONDecodeError:
+            pass
+        else:
+            # 顶层标量恰好到缓冲区末尾时可能被截断，走下面的慢路径
+            if (end < len(self.buf) or self.eof) and (
+                    not self.bad_bytes or not _BAD_BYTES_RE.search(self.buf, start, end)):
+                self.pos = end
+                return value
+        # 数据不完整或值本身损坏：先按括号配对确定边界，再单独解码这一段
+        start, end = self._scan_end(start)
+        offset = self.tell(start)
+        raw = self.buf[start:end]
+        self.pos = end
+        bad = _BAD_BYTES_RE.search(raw)
+        if bad:
+            raise RecordError(offset, f"非法 UTF-8 字节 (偏移 {offset + _byte_length(raw[:bad.start()])})")
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise RecordError(offset, f"{e.msg} (偏移 {offset + _byte_length(raw[:e.pos])})") from None
+
+    def _scan_end(self, start):
+        """找出从 start 开始的值的结束下标，必要时继续读文件；返回 (start, end)（读入新数据后下标会变）"""
+        first = self.buf[start]
+        while True:
+            end = None
+            if first in "{[":
+                # 只数与开头同类的括号，内部 [ ] 配错不会吞掉后面的记录
+                close = "}" if first == "{" else "]"
+                depth = 0
+                for m in _STRUCT_RE.finditer(self.buf, start):
+                    token = m.group()
+                    if token == first:
+                        depth += 1
+                    elif token == close:
+                        depth -= 1
+                        if depth == 0:
+                            end = m.end()
+                            break
+            else:
+                m = (_STRUCT_RE if first == '"' else _SCALAR_RE).match(self.buf, start)
+                # 匹配到缓冲区末尾时值可能被截断，先多读一块
+                if m and (m.end() < len(self.buf) or self.eof):
+                    end = m.end()
+                elif m is None and "\n" in self.buf[start:]:
+                    end = self.buf.index("\n", start)
+            if end is not None:
+                return start, end
+            start_offset = self.tell(start)
+            if len(self.buf) - start > MAX_VALUE_BYTES:
+                raise TruncatedError(f"偏移 {start_offset} 处的值超过 {MAX_VALUE_BYTES} 字节仍未闭合")
+            self.pos = start
+            if not self.fill():
+                raise TruncatedError(f"偏移 {start_offset} 处的值未闭合，文件已结束")
+            start = self.pos
+
+    def skip_garbage(self):
+        """跳过无法识别的内容，停在下一个 '{' 或 ']' 上"""
+        while True:
+            m = _RESYNC_RE.search(self.buf, self.pos)
+            if m:
+                self.pos = m.start()
+                return
+            self.pos = len(self.buf)
+            if not self.fill():
+                return
+
+def iter_papers(reader, corpus):
+    """逐条产出 papers 数组里的记录；损坏的记录写入 corpus.errors 后跳过"""
+    reader.expect("[")
+    while True:
+        token = reader.peek()
+        if token == "]":
+            reader.pos += 1
+            return
+        if token == ",":
+            reader.pos += 1
+            continue
+        if not token:
+            raise TruncatedError(f"papers 数组在偏移 {reader.tell()} 处意外结束")
+        if token != "{":
+            corpus.add_error(reader.tell(), "papers 数组中出现非对象内容")
+            reader.skip_garbage()
+            continue
+        try:
+            paper = reader.read_value()
+        except RecordError as e:
+            corpus.add_error(e.offset, str(e))
+            continue
+        yield paper
+
+def load_corpus(path, chunk_size=CHUNK_SIZE):
+    """流式加载整个文件；文档没读完（文件截断）时 corpus.complete 为 False，已读到的记录照样保留"""
+    corpus = Corpus()
+    with open(path, "rb") as f:
+        reader = _Reader(f, chunk_size)
+        # 兼容 UTF-8 BOM
+        if reader.peek() == "\ufeff":
+            reader.pos += 1
+        try:
+            if reader.peek() == "[":
+                # 顶层直接是论文数组
+                corpus.papers.extend(iter_papers(reader, corpus))
+                corpus.complete = True
+                return corpus
+            reader.expect("{")
+            while True:
+                token = reader.peek()
+                if token == "}":
+                    corpus.complete = True
+                    return corpus
+                if token == ",":
+                    reader.pos += 1
+                    continue
+                key = reader.read_value()
+                reader.expect(":")
+                if key == "papers" and reader.peek() == "[":
+                    corpus.papers.extend(iter_papers(reader, corpus))
+                    continue
+                try:
+                    value = reader.read_value()
+                except RecordError as e:
+                    corpus.add_error(e.offset, f"{key}: {e}")
+                    continue
+                if key == "statistics" and isinstance(value, dict):
+                    corpus.stats = value
+        except ValueError as e:
+            # 文件截断，或顶层结构损坏导致无法继续定位记录
+            corpus.add_error(reader.tell(), str(e))
+    return corpus
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="检查语料文件，列出无法解析的记录")
+    parser.add_argument("path", nargs="?", default="papers.json")
+    args = parser.parse_args()
+    result = load_corpus(args.path)
+    print(f"📚 可加载: {len(result.papers)} 篇" + ("" if result.complete else " (文件不完整)"))
+    for error in result.errors:
+        print(f"❌ 偏移 {error['offset']}: {error['error']}")
+    sys.exit(1 if result.errors else 0)
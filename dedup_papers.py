@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""文献语料去重与合并
+
+    python dedup_papers.py papers.json papers_backup.json papers_filtered.json \
+        -o papers_merged.json --report dedup_report.json
+
+1. 完全重复：id 相同，或 DOI 相同（忽略 N/A、10.1000/ 示例前缀、以及被大量
+   不同论文共用的占位 DOI）
+2. 近似重复：标题 + 摘要分词（复用检索的中英混合分词）后取相邻词对作 shingle，
+   用单次哈希 MinHash（one permutation hashing + 旋转补齐）生成签名，再按
+   band 做 LSH 分桶，只对同桶候选对计算真实 Jaccard，避免 O(n²) 两两比较
+3. 簇按完全链接合并：两簇合并前，跨簇的每一对记录都必须是重复（id 或 DOI
+   相同，或 Jaccard 达到阈值），且年份、DOI 不冲突，近似重复链不会把不同论文
+   串成一簇。id 相同的记录总是合并（合并结果里 id 必须唯一）
+4. 每个重复簇保留一条主记录：输入文件靠前者优先，缺失字段从其它记录补齐
+
+合并结果与 papers.json 同样的布局，报告列出每个簇的成员、来源和相似度。
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from search_index import tokenize
+
+# MinHash 签名长度 = BANDS * ROWS；阈值约 (1/BANDS)^(1/ROWS) ≈ 0.77
+NUM_BINS = 64
+BANDS = 8
+ROWS = 8
+# 候选对的真实 Jaccard 达到该值才算近似重复
+NEAR_DUP_THRESHOLD = 0.8
+# LSH 桶内成员不超过该数时两两比较
+MAX_BUCKET_PAIRWISE = 32
+# 去重后的文本数达到该值才启用进程池
+PARALLEL_MIN_TEXTS = 5000
+# 同一 DOI 下超过这么多篇论文，视为占位 DOI 不参与合并
+MAX_DOI_GROUP = 5
+# 视为缺失的取值
+MISSING_VALUES = ("", "N/A", [], {})
+
+_HASH_MAX = (1 << 64) - 1
+_DOI_PREFIX_RE = re.compile(r"^(https?://(dx\.)?doi\.org/|doi:)", re.I)
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data, data.get("papers", [])
+
+def normalize_doi(doi):
+    if not isinstance(doi, str):
+        return None
+    doi = _DOI_PREFIX_RE.sub("", doi.strip()).lower()
+    # 10.1000 是 DOI 手册里的示例前缀
+    if not doi.startswith("10.") or doi.startswith("10.1000/"):
+        return None
+    return doi
+
+def shingles(text):
+    tokens = tokenize(text)
+    if len(tokens) < 2:
+        return set(tokens)
+    return {a + " " + b for a, b in zip(tokens, tokens[1:])}
+
+class MinHasher:
+    """单次哈希 MinHash：每个 shingle 只哈希一次，落到 NUM_BINS 个桶中取最小值"""
+
+    def __init__(self, num_bins=NUM_BINS):
+        self.num_bins = num_bins
+        # shingle -> (桶内取值, 桶号)，签名循环里不再做大整数除法
+        self._cache = {}
+
+    def token_hash(self, token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def signature(self, tokens):
+        k = self.num_bins
+        sig = [_HASH_MAX] * k
+        cache = self._cache
+        for token in tokens:
+            slot = cache.get(token)
+            if slot is None:
+                slot = cache[token] = divmod(self.token_hash(token), k)
+            v, b = slot
+            if v < sig[b]:
+                sig[b] = v
+        if all(v == _HASH_MAX for v in sig):
+            return None
+        # 空桶用右侧第一个非空桶的值补齐，并加上偏移区分来源
+        filled = list(sig)
+        for j in range(k):
+            if sig[j] == _HASH_MAX:
+                step = 1
+                while sig[(j + step) % k] == _HASH_MAX:
+                    step += 1
+                filled[j] = sig[(j + step) % k] + step * (_HASH_MAX // k // k)
+        return filled
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+        # 根 -> 簇内全部下标
+        self.members = {i: [i] for i in range(n)}
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # 下标小（输入靠前）的作为根
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+            self.members[ra].extend(self.members.pop(rb))
+
+    def cluster(self, x):
+        return self.members[self.find(x)]
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+def jaccard_at_least(a, b, threshold):
+    """Jaccard 达到 threshold 时返回其值，否则返回 0.0
+
+    LSH 候选对绝大多数远低于阈值。J >= t 等价于交集 >= t(|a|+|b|)/(1+t)，
+    逐个检查小集合的元素，不在另一集合里的个数一超过上限就停下，
+    不必构造交集；只有可能达标的对才计算精确值。
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    # 最多允许的缺失数；小于 0 即 |a| < t|b|，不可能达标
+    allowed = len(a) - threshold * (len(a) + len(b)) / (1 + threshold) + 1e-9
+    if allowed < 0:
+        return 0.0
+    misses = 0
+    for x in a:
+        if x not in b:
+            misses += 1
+            if misses > allowed:
+                return 0.0
+    score = jaccard(a, b)
+    return score if score >= threshold else 0.0
+
+_hasher = MinHasher()
+
+def text_features(text):
+    """一段文本的 shingle 集合与各 band 的 LSH 键（进程池里逐条调用）"""
+    tokens = shingles(text)
+    sig = _hasher.signature(tokens)
+    if sig is None:
+        return tokens, None
+    return tokens, [(band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+def paper_year(paper):
+    year = paper.get("year")
+    return year if isinstance(year, int) and not isinstance(year, bool) else None
+
+def raw_doi(paper):
+    """去掉前缀、转小写后的 DOI 原文；示例前缀也保留，只用于判断冲突"""
+    doi = (paper.get("journal_info") or {}).get("doi") or paper.get("doi")
+    if not isinstance(doi, str) or is_missing(doi.strip()):
+        return None
+    return _DOI_PREFIX_RE.sub("", doi.strip()).lower()
+
+def paper_doi(paper):
+    return normalize_doi(raw_doi(paper))
+
+def find_duplicates(records, threshold=NEAR_DUP_THRESHOLD, max_doi_group=MAX_DOI_GROUP, workers=1):
+    """records: [(来源, paper)]，返回 (UnionFind, 边列表, 可疑 DOI, 因完全链接被拒绝的近似对数)"""
+    n = len(records)
+    uf = UnionFind(n)
+    edges = []
+    papers = [paper for _, paper in records]
+    dois = [paper_doi(paper) for paper in papers]
+    # 每个簇里出现过的年份与 DOI 原文（根 -> 集合）。年份或 DOI 都给出且不同的两条
+    # 记录不是同一篇论文；DOI 比较的是原文：10.1000/ 示例前缀虽然不能用来判定重复，
+    # 写得不同也说明是不同的论文
+    years = {i: {year} if year is not None else set() for i, year in enumerate(map(paper_year, papers))}
+    raw_dois = {i: {doi} if doi is not None else set() for i, doi in enumerate(map(raw_doi, papers))}
+
+    def clusters_conflict(ra, rb):
+        """两簇之间是否存在年份或 DOI 冲突的记录对"""
+        for values in (years, raw_dois):
+            a, b = values[ra], values[rb]
+            if a and b and not (len(a) == 1 and a == b):
+                return True
+        return False
+
+    def join(a, b):
+        ra, rb = uf.find(a), uf.find(b)
+        uf.union(a, b)
+        root = uf.find(a)
+        other = rb if root == ra else ra
+        for values in (years, raw_dois):
+            values[root] |= values.pop(other)
+
+    # 1. id 完全相同
+    first_by_id = {}
+    for i, (_, paper) in enumerate(records):
+        pid = paper.get("id")
+        if pid is None:
+            continue
+        j = first_by_id.setdefault(pid, i)
+        if j != i and uf.find(j) != uf.find(i):
+            join(j, i)
+            edges.append((j, i, "id", 1.0))
+
+    # 2. DOI 完全相同
+    by_doi = {}
+    for i, doi in enumerate(dois):
+        if doi:
+            by_doi.setdefault(doi, []).append(i)
+    suspicious_dois = {}
+    for doi, members in by_doi.items():
+        distinct_ids = {records[i][1].get("id") for i in members}
+        if len(distinct_ids) > max_doi_group:
+            suspicious_dois[doi] = len(members)
+            continue
+        for i in members[1:]:
+            ra, rb = uf.find(members[0]), uf.find(i)
+            if ra != rb and not clusters_conflict(ra, rb):
+                join(members[0], i)
+                edges.append((members[0], i, "doi", 1.0))
+
+    # 3. MinHash + LSH 近似重复
+    # 文本完全相同的记录（备份、筛选副本）共用 shingle 集合与签名
+    texts = [(paper.get("title") or "") + " " + (paper.get("abstract") or "") for _, paper in records]
+    unique_texts = list(dict.fromkeys(texts))
+    if workers > 1 and len(unique_texts) >= PARALLEL_MIN_TEXTS:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            features = list(pool.map(text_features, unique_texts, chunksize=512))
+    else:
+        features = [text_features(text) for text in unique_texts]
+    by_text = dict(zip(unique_texts, features))
+    shingle_sets = [by_text[text][0] for text in texts]
+    band_keys = [by_text[text][1] for text in texts]
+    ids = [paper.get("id") for paper in papers]
+
+    def similarity(a, b):
+        """达不到阈值时为 0.0"""
+        if texts[a] == texts[b]:
+            return 1.0
+        return jaccard_at_least(shingle_sets[a], shingle_sets[b], threshold)
+
+    def duplicate(a, b):
+        """不考虑冲突时 a、b 是否重复（冲突由 clusters_conflict 按簇判断）"""
+        if ids[a] is not None and ids[a] == ids[b]:
+            return True
+        if dois[a] is not None and dois[a] == dois[b] and dois[a] not in suspicious_dois:
+            return True
+        return similarity(a, b) >= threshold
+
+    buckets = {}
+    for i, keys in enumerate(band_keys):
+        for key in keys or ():
+            buckets.setdefault(key, []).append(i)
+    checked = set()
+    rejected = 0
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # 小桶内两两比较；异常大的桶（大量模板化文本）只与桶首比较，保持线性
+        if len(members) <= MAX_BUCKET_PAIRWISE:
+            pairs = combinations(members, 2)
+        else:
+            pairs = ((members[0], i) for i in members[1:])
+        for a, b in pairs:
+            ra, rb = uf.find(a), uf.find(b)
+            if ra == rb or (a, b) in checked:
+                continue
+            checked.add((a, b))
+            score = similarity(a, b)
+            if not score:
+                continue
+            # 完全链接：两簇之间每一对都必须是重复且互不冲突，否则不合并
+            if not clusters_conflict(ra, rb) and all(
+                    duplicate(x, y) for x in uf.members[ra] for y in uf.members[rb]):
+                join(a, b)
+                edges.append((a, b, "near", round(score, 4)))
+            else:
+                rejected += 1
+    return uf, edges, suspicious_dois, rejected
+
+def is_missing(value):
+    return value is None or value in MISSING_VALUES
+
+def merge_records(papers):
+    """第一篇为主记录，缺失字段（含 journal_info 内部）从其余记录补齐"""
+    if len(papers) == 1:
+        return papers[0]
+    merged = dict(papers[0])
+    if isinstance(merged.get("journal_info"), dict):
+        merged["journal_info"] = dict(merged["journal_info"])
+    for other in papers[1:]:
+        for key, value in other.items():
+            if key not in merged or is_missing(merged[key]):
+                if not is_missing(value):
+                    merged[key] = value
+            elif key == "journal_info" and isinstance(merged[key], dict) and isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    if is_missing(merged[key].get(sub_key)) and not is_missing(sub_value):
+                        merged[key][sub_key] = sub_value
+    return merged
+
+def corpus_statistics(papers):
+    """与 src/lib/db.js 的 getStats 口径一致"""
+    stats = {"total_papers": len(papers), "q1": 0, "q2": 0, "q3": 0, "ei": 0}
+    for paper in papers:
+        ranking = (paper.get("journal_info") or {}).get("ranking") or ""
+        if "Q1" in ranking or "CCF-A" in ranking:
+            stats["q1"] += 1
+        if "Q2" in ranking or "CCF-B" in ranking:
+            stats["q2"] += 1
+        if "Q3" in ranking or "CCF-C" in ranking:
+            stats["q3"] += 1
+        if "EI" in ranking:
+            stats["ei"] += 1
+    return stats
+
+def dedup(paths, threshold=NEAR_DUP_THRESHOLD, max_doi_group=MAX_DOI_GROUP, workers=1):
+    started = time.perf_counter()
+    records = []
+    first_data = None
+    # 加载和匹配只分配（记录、shingle 集合、桶），不产生循环引用；
+    # 期间暂停循环 GC，避免对象数上百万时反复全量扫描
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for path in paths:
+            data, papers = load_corpus(path)
+            if first_data is None:
+                first_data = data
+            source = os.path.basename(path)
+            records.extend((source, paper) for paper in papers)
+
+        uf, edges, suspicious_dois, rejected = find_duplicates(records, threshold, max_doi_group, workers)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    clusters = {}
+    for i in range(len(records)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    merged = [merge_records([records[i][1] for i in members]) for _, members in sorted(clusters.items())]
+
+    edges_by_root = {}
+    for a, b, kind, score in edges:
+        edges_by_root.setdefault(uf.find(a), []).append({
+            "a": records[a][1].get("id"), "b": records[b][1].get("id"),
+            "a_source": records[a][0], "b_source": records[b][0],
+            "kind": kind, "similarity": score,
+        })
+    report_clusters = []
+    for root, members in sorted(clusters.items()):
+        if len(members) < 2:
+            continue
+        report_clusters.append({
+            "canonical": records[root][1].get("id"),
+            "title": records[root][1].get("title"),
+            "members": [{"id": records[i][1].get("id"), "source": records[i][0]} for i in members],
+            "links": edges_by_root.get(root, []),
+        })
+
+    kinds = {}
+    for _, _, kind, _ in edges:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    corpus = {
+        "title": (first_data or {}).get("title", ""),
+        "description": (first_data or {}).get("description", ""),
+        "statistics": corpus_statistics(merged),
+        "papers": merged,
+    }
+    report = {
+        "inputs": [os.path.basename(p) for p in paths],
+        "input_records": len(records),
+        "merged_records": len(merged),
+        "duplicate_links": kinds,
+        "near_duplicate_threshold": threshold,
+        "rejected_near_links": rejected,
+        "suspicious_dois": suspicious_dois,
+        "seconds": round(time.perf_counter() - started, 3),
+        "clusters": report_clusters,
+    }
+    return corpus, report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文献语料去重与合并（id / DOI / MinHash-LSH）")
+    parser.add_argument("inputs", nargs="+", help="按优先级排列的语料文件，靠前的作为主记录")
+    parser.add_argument("-o", "--output", default="papers_merged.json")
+    parser.add_argument("--report", default="dedup_report.json")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD, help="近似重复的 Jaccard 阈值")
+    parser.add_argument("--max-doi-group", type=int, default=MAX_DOI_GROUP)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="分词与签名的进程数")
+    args = parser.parse_args(argv)
+
+    corpus, report = dedup(args.inputs, args.threshold, args.max_doi_group, args.workers)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(corpus, f, ensure_ascii=False, indent=2)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"📥 输入 {report['input_records']} 篇 -> 📦 合并后 {report['merged_records']} 篇 ({report['seconds']}s)")
+    for kind, count in sorted(report["duplicate_links"].items()):
+        print(f"   {kind}: {count}")
+    if report["rejected_near_links"]:
+        print(f"🔗 {report['rejected_near_links']} 对近似记录与所在簇的其它成员不符，未合并")
+    if report["suspicious_dois"]:
+        print(f"⚠️  忽略 {len(report['suspicious_dois'])} 个被多篇论文共用的 DOI")
+    print(f"📝 结果: {args.output}  报告: {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
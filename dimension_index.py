@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""信任维度倒排索引：维度键 / 三元组子串 -> 论文位图"""
+
+import threading
+
+from bitsets import bitset_from_indices, union
+
+# 子串查询结果缓存上限（每个快照一份）
+SUBSTRING_CACHE_SIZE = 1024
+
+def normalize_dimension(text):
+    return text.strip().lower().replace(" ", "_").replace("-", "_")
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class DimensionIndex:
+    """构建后只读；子串匹配先用三元组求候选键，再逐个确认"""
+
+    def __init__(self, papers):
+        size = len(papers)
+        members = {}
+        for i, paper in enumerate(papers):
+            for key in (paper.get("trust_dimensions") or {}):
+                members.setdefault(normalize_dimension(key), []).append(i)
+        self.size = size
+        self.key_masks = {key: bitset_from_indices(m, size) for key, m in members.items()}
+        self.key_counts = {key: len(m) for key, m in members.items()}
+
+        gram_keys = {}
+        for key in self.key_masks:
+            for gram in trigrams(key):
+                gram_keys.setdefault(gram, set()).add(key)
+        self.gram_keys = {gram: frozenset(keys) for gram, keys in gram_keys.items()}
+
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def __getstate__(self):
+        # 查询缓存和锁不进快照缓存
+        state = self.__dict__.copy()
+        del state["_cache"], state["_cache_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def matching_keys(self, needle):
+        """键名包含 needle 的所有维度键"""
+        needle = normalize_dimension(needle)
+        if not needle:
+            return set(self.key_masks)
+        if len(needle) < 3:
+            # 太短无法用三元组，直接扫一遍键名（键的数量远小于论文数）
+            candidates = self.key_masks
+        else:
+            candidates = None
+            for gram in trigrams(needle):
+                keys = self.gram_keys.get(gram)
+                if not keys:
+                    return set()
+                candidates = keys if candidates is None else candidates & keys
+        return {key for key in candidates if needle in key}
+
+    def substring_mask(self, needle):
+        needle = normalize_dimension(needle)
+        mask = self._cache.get(needle)
+        if mask is None:
+            mask = union(self.key_masks[key] for key in self.matching_keys(needle))
+            with self._cache_lock:
+                if len(self._cache) >= SUBSTRING_CACHE_SIZE:
+                    self._cache.clear()
+                self._cache[needle] = mask
+        return mask
+
+    def mask(self, dimensions):
+        """多个维度条件取交集，每个条件按子串匹配"""
+        result = (1 << self.size) - 1
+        for dimension in dimensions:
+            result &= self.substring_mask(dimension)
+            if not result:
+                break
+        return result
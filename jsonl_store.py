@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""JSONL 语料：每行一篇论文，旁挂按 id 的偏移索引，通过 mmap 随机读取
+
+papers.jsonl 旁边的 papers.jsonl.idx 记录每行的起止字节偏移、id 和
+statistics（JSONL 本身放不下顶层字段）。JsonlStore 实现了序列接口：
+store[i] / store.get(paper_id) 只解码对应的那一行，切片只读取切片范围内的行。
+
+索引与数据文件的大小、mtime 不一致时会重新扫描数据文件建索引（statistics
+沿用旧索引里的）。文件最后一行没有换行符或无法解析时视为还在写入，
+complete 为 False，热更新不会换上这样的快照。数据文件必须整体替换（写临时文件再 rename）而不是原地改写：旧快照
+仍映射着旧文件，原地截断会让读取越界。
+
+    python jsonl_store.py papers.json papers.jsonl
+
+把现有的 papers.json 转成 JSONL 并生成索引。
+"""
+
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Sequence
+
+from corpus_loader import Corpus, load_corpus
+
+INDEX_SUFFIX = ".idx"
+# 索引格式变化时递增
+INDEX_VERSION = 2
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+def _write_atomic(path, data):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _file_key(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+class JsonlStore(Sequence):
+    """只读的 JSONL 论文集合；store[i] 返回与原始 JSON 一致的 dict"""
+
+    def __init__(self, path):
+        self.path = path
+        self.errors = []
+        self.stats = {}
+        self.complete = True
+        self._open()
+        if not self._load_index():
+            self._build_index()
+            try:
+                self.save_index()
+            except OSError:
+                pass
+        self._index_ids()
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件不能 mmap
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def _load_index(self):
+        try:
+            with open(index_path(self.path), "rb") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if index.get("version") != INDEX_VERSION:
+            return False
+        # 数据文件变了也沿用原来的 statistics，只重建偏移
+        self.stats = index.get("statistics") or {}
+        if index.get("source") != list(_file_key(self.path)):
+            return False
+        self.ids = index["ids"]
+        self._offsets = array("q", index["offsets"])
+        self.complete = index["complete"]
+        return True
+
+    def _build_index(self):
+        """逐行扫描数据文件；无法解析的行记入 errors 后跳过
+
+        中间的坏行只是单条记录损坏；最后一行没有换行符或解析失败则说明文件
+        可能正在写入，complete 置为 False。
+        """
+        mm = self._mm
+        ids = []
+        offsets = array("q")
+        start = 0
+        end_of_file = len(mm)
+        last_ok = True
+        while start < end_of_file:
+            end = mm.find(b"\n", start)
+            if end < 0:
+                end = end_of_file
+            line = mm[start:end].strip()
+            if line:
+                try:
+                    paper = json.loads(line)
+                    if not isinstance(paper, dict):
+                        raise ValueError("不是 JSON 对象")
+                except ValueError as e:
+                    self.errors.append({"offset": start, "error": str(e)})
+                    last_ok = False
+                else:
+                    ids.append(paper.get("id"))
+                    offsets.append(start)
+                    offsets.append(end)
+                    last_ok = True
+            start = end + 1
+        self.ids = ids
+        self._offsets = offsets
+        self.complete = last_ok and (end_of_file == 0 or mm[end_of_file - 1:end_of_file] == b"\n")
+
+    def save_index(self):
+        index = {
+            "version": INDEX_VERSION,
+            "source": list(_file_key(self.path)),
+            "statistics": self.stats,
+            "complete": self.complete,
+            "ids": self.ids,
+            "offsets": self._offsets.tolist(),
+        }
+        _write_atomic(index_path(self.path), json.dumps(index, ensure_ascii=False).encode("utf-8"))
+
+    def __getstate__(self):
+        # 快照缓存按内容哈希命中，反序列化时重新映射同一路径即可
+        return {"path": self.path, "ids": self.ids, "offsets": self._offsets, "stats": self.stats,
+                "complete": self.complete}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self.ids = state["ids"]
+        self._offsets = state["offsets"]
+        self.stats = state["stats"]
+        self.complete = state["complete"]
+        self.errors = []
+        self._open()
+        self._index_ids()
+
+    def _index_ids(self):
+        positions = {}
+        for i, paper_id in enumerate(self.ids):
+            positions.setdefault(paper_id, i)
+        self._positions = positions
+
+    def close(self):
+        if self._mm:
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def raw(self, index):
+        """第 index 篇的原始 JSON 字节"""
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError(index)
+        return self._mm[self._offsets[2 * index]:self._offsets[2 * index + 1]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [json.loads(self.raw(i)) for i in range(*index.indices(len(self.ids)))]
+        return json.loads(self.raw(index))
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield json.loads(self.raw(i))
+
+    def get(self, paper_id, default=None):
+        """按 id 取一篇；重复 id 以第一篇为准"""
+        index = self._positions.get(paper_id)
+        return default if index is None else self[index]
+
+def load_jsonl(path):
+    """读取整个 JSONL 语料，返回 (Corpus, JsonlStore)；Corpus 与 corpus_loader.load_corpus 的结果同形"""
+    store = JsonlStore(path)
+    corpus = Corpus()
+    corpus.papers = list(store)
+    corpus.stats = store.stats
+    corpus.errors = list(store.errors)
+    corpus.complete = store.complete
+    return corpus, store
+
+def convert(src, dst):
+    """把 {"papers": [...]} 格式的文件转成 JSONL 并写好索引，返回 (篇数, 跳过的记录)"""
+    corpus = load_corpus(src)
+    ids = []
+    offsets = array("q")
+    position = 0
+    tmp = f"{dst}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        for paper in corpus.papers:
+            line = json.dumps(paper, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            ids.append(paper.get("id"))
+            offsets.append(position)
+            offsets.append(position + len(line))
+            f.write(line + b"\n")
+            position += len(line) + 1
+    os.replace(tmp, dst)
+    store = JsonlStore.__new__(JsonlStore)
+    store.path = dst
+    store.ids = ids
+    store._offsets = offsets
+    store.stats = corpus.stats
+    store.complete = True
+    store.save_index()
+    return len(ids), corpus.errors
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把 papers.json 转成 JSONL + 偏移索引")
+    parser.add_argument("src", nargs="?", default="papers.json")
+    parser.add_argument("dst", nargs="?", help="默认与 src 同名，扩展名改为 .jsonl")
+    args = parser.parse_args()
+    dst = args.dst or os.path.splitext(args.src)[0] + ".jsonl"
+    count, errors = convert(args.src, dst)
+    for error in errors:
+        print(f"❌ 偏移 {error['offset']}: {error['error']}")
+    print(f"📝 {count} 篇 -> {dst} (索引 {index_path(dst)})")
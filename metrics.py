@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""进程内的轻量指标：计数器与直方图，按 Prometheus 文本格式导出
+
+每次记录只是一次二分查找加一把锁内的几次整数加法，不依赖 prometheus_client。
+多进程部署时每个进程各自计数，/metrics 只反映处理该次抓取的进程。
+"""
+
+import bisect
+import threading
+import time
+
+# 请求耗时（秒）的桶边界
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 响应大小（字节）的桶边界：1KB 到 64MB，每档 4 倍
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _format_labels(names, values, extra=()):
+    pairs = [(name, value) for name, value in zip(names, values)] + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """累积桶直方图；每组标签各自一份计数"""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数（不累积）..., +Inf 桶计数, 总和]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def snapshot(self, *label_values):
+        """返回 (累积桶计数列表, 总数, 总和)，便于测试或脚本读取"""
+        with self._lock:
+            series = list(self._series.get(label_values) or [0] * (len(self.buckets) + 1) + [0.0])
+        cumulative = []
+        total = 0
+        for count in series[:-1]:
+            total += count
+            cumulative.append(total)
+        return cumulative, total, series[-1]
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            keys = sorted(self._series)
+        for label_values in keys:
+            cumulative, total, value_sum = self.snapshot(*label_values)
+            for bound, count in zip(self.buckets + (float("inf"),), cumulative):
+                labels = _format_labels(self.labels, label_values, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(value_sum)}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+class Gauge:
+    """抓取时才调用 fn 取值，平时没有任何开销"""
+
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+
+    def expose(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(self.fn())}"]
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, fn):
+        return self.register(Gauge(name, help_text, fn))
+
+    def expose(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "clawpaper_request_duration_seconds", "请求耗时（流式响应计到最后一块发送完）", ("route", "method"))
+RESPONSE_SIZE = REGISTRY.histogram(
+    "clawpaper_response_size_bytes", "响应体字节数（压缩后）", ("route",), SIZE_BUCKETS)
+REQUESTS = REGISTRY.counter("clawpaper_requests_total", "按路由和状态码计数的请求数", ("route", "method", "status"))
+# 首页渲染、全量导出等内部阶段的耗时，流式输出时不含等待客户端读取的时间
+PHASE_LATENCY = REGISTRY.histogram("clawpaper_render_phase_seconds", "渲染阶段耗时", ("route", "phase"))
+
+class PhaseTimer:
+    """在生成器里累计某个阶段的纯计算时间：yield 前 pause()，恢复后 resume()"""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._started = time.perf_counter()
+
+    def pause(self):
+        self.elapsed += time.perf_counter() - self._started
+
+    def resume(self):
+        self._started = time.perf_counter()
+
+    def observe(self, route, phase):
+        PHASE_LATENCY.observe(self.elapsed, route, phase)
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""文献数据快照：加载、聚合与热更新
+
+所有由 papers.json 推导出的数据都打包在一个 Snapshot 里，构建完成后整体替换，
+请求处理中只需在开头取一次 current_snapshot()，之后就不会看到半成品。
+"""
+
+import os
+import json
+import hashlib
+import heapq
+import logging
+import threading
+import time
+
+import pdf_text
+import snapshot_cache
+from author_index import AuthorIndex
+from bitsets import bitset_from_indices, bitset_bytes, union
+from compact_store import CompactStore
+from corpus_loader import load_corpus
+from jsonl_store import load_jsonl
+from related_index import RelatedIndex
+from dimension_index import DimensionIndex
+from search_index import SearchIndex
+from sqlite_store import SqliteStore
+
+LITERATURE_DIR = os.environ.get("CLAWPAPER_DIR", "/Users/lcy/clawd/clawpaper")
+RELOAD_INTERVAL = float(os.environ.get("CLAWPAPER_RELOAD_INTERVAL", "2"))
+# 大语料时改用紧凑内存表示（见 compact_store.py）
+COMPACT_PAPERS = os.environ.get("CLAWPAPER_COMPACT", "") == "1"
+# SQLite 数据库路径（见 sqlite_store.py），设置后查询接口改由 SQLite 执行
+SQLITE_PATH = os.environ.get("CLAWPAPER_SQLITE", "")
+# PDF 全文抽取（需要 pypdf）：文本缓存目录与进程数，见 pdf_text.py
+PDF_TEXT_CACHE_DIR = os.environ.get("CLAWPAPER_PDF_CACHE", os.path.join(LITERATURE_DIR, ".pdf_text_cache"))
+PDF_WORKERS = int(os.environ.get("CLAWPAPER_PDF_WORKERS", "0")) or None
+# 检索时 PDF 正文得分的权重（标题、摘要等元数据为 1）
+PDF_SCORE_WEIGHT = 0.5
+# 处理好的快照缓存目录，设为空字符串可关闭
+SNAPSHOT_CACHE_DIR = os.environ.get("CLAWPAPER_SNAPSHOT_CACHE", os.path.join(LITERATURE_DIR, ".snapshot_cache"))
+
+logger = logging.getLogger(__name__)
+
+def resolve_source():
+    """返回当前应加载的文献文件路径（papers.jsonl > papers.json > papers_full.json），都不存在时返回 None"""
+    # 转换过的 JSONL 语料（见 jsonl_store.py）
+    jsonl_file = os.path.join(LITERATURE_DIR, "papers.jsonl")
+    if os.path.exists(jsonl_file):
+        return jsonl_file
+    # 优先加载新的500篇文献
+    new_papers_file = os.path.join(LITERATURE_DIR, "papers.json")
+    if os.path.exists(new_papers_file):
+        return new_papers_file
+    # 回退到原有文献
+    old_papers_file = os.path.join(LITERATURE_DIR, "papers_full.json")
+    if os.path.exists(old_papers_file):
+        return old_papers_file
+    return None
+
+def source_signature(path):
+    """文件签名 (路径, mtime_ns, size)，用于判断是否需要重新加载"""
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+def read_corpus(path):
+    """流式加载语料，损坏的记录跳过并逐条记入日志；JSONL 语料同时返回其 JsonlStore，否则为 None"""
+    store = None
+    if path.endswith(".jsonl"):
+        corpus, store = load_jsonl(path)
+    else:
+        corpus = load_corpus(path)
+        # 旧文件没有 statistics 字段
+        if os.path.basename(path) != "papers.json":
+            corpus.stats = {}
+    for error in corpus.errors:
+        logger.warning("%s: 偏移 %d 处的记录已跳过: %s", path, error["offset"], error["error"])
+    return corpus, store
+
+def load_papers(path=None):
+    if path is None:
+        path = resolve_source()
+    if path is None:
+        return [], {}
+    corpus, _ = read_corpus(path)
+    return corpus.papers, corpus.stats
+
+def file_digest(path):
+    """分块计算文件 sha1，不把整个文件读进内存"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# 期刊/会议级别分档，数字越小级别越高
+RANKING_TIERS = {
+    "SCI Q1": 1, "CCF-A": 1,
+    "SCI Q2": 2, "CCF-B": 2,
+    "SCI Q3": 3, "CCF-C": 3,
+    "EI": 4,
+}
+UNRANKED_TIER = 5
+
+SORT_KEYS = ("default", "year_desc", "year_asc", "if_desc", "if_asc", "ranking")
+
+def parse_impact_factor(value):
+    """把影响因子统一成 float，'N/A'、空值等返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+def ranking_tier(ranking):
+    return RANKING_TIERS.get((ranking or "").strip(), UNRANKED_TIER)
+
+def build_sort_orders(years, impact_factors, tiers):
+    n = len(years)
+    indices = range(n)
+    with_if = [i for i in indices if impact_factors[i] is not None]
+    without_if = [i for i in indices if impact_factors[i] is None]
+    # 排序稳定，同值保持原始顺序；没有影响因子的论文无论升降序都排在最后
+    return {
+        "default": tuple(indices),
+        "year_desc": tuple(sorted(indices, key=lambda i: -years[i])),
+        "year_asc": tuple(sorted(indices, key=lambda i: years[i])),
+        "if_desc": tuple(sorted(with_if, key=lambda i: -impact_factors[i]) + without_if),
+        "if_asc": tuple(sorted(with_if, key=lambda i: impact_factors[i]) + without_if),
+        "ranking": tuple(sorted(indices, key=lambda i: tiers[i])),
+    }
+
+# 相关论文索引的构建锁：并发的首次访问只构建一次
+_related_lock = threading.Lock()
+
+class Snapshot:
+    """某一时刻文献数据及其全部派生结构，构建后只读"""
+
+    def __init__(self, papers, stats, signature=None, load_errors=()):
+        self.papers = papers
+        self.stats = stats
+        self.signature = signature
+        # 加载时跳过的记录 [{"offset", "error"}]
+        self.load_errors = list(load_errors)
+
+        # 提取所有唯一维度
+        dimensions = set()
+        for paper in papers:
+            if paper.get("trust_dimensions"):
+                dimensions.update(paper["trust_dimensions"].keys())
+        self.dimensions = frozenset(dimensions)
+
+        # 统计年份分布
+        year_distribution = {}
+        for paper in papers:
+            year = paper.get("year", 0)
+            year_distribution[year] = year_distribution.get(year, 0) + 1
+        self.year_distribution = year_distribution
+
+        # 统计期刊级别
+        journal_levels = {}
+        for paper in papers:
+            level = (paper.get("journal_info") or {}).get("ranking", "Unknown")
+            journal_levels[level] = journal_levels.get(level, 0) + 1
+        self.journal_levels = journal_levels
+
+        # 排序所需的数值在加载时解析一次，各种排序顺序预先算好
+        n = len(papers)
+        years = []
+        impact_factors = []
+        tiers = []
+        year_members = {}
+        ranking_members = {}
+        tier_members = {}
+        type_members = {}
+        for i, paper in enumerate(papers):
+            journal_info = paper.get("journal_info") or {}
+            year = paper.get("year") if isinstance(paper.get("year"), int) else 0
+            years.append(year)
+            impact_factors.append(parse_impact_factor(journal_info.get("impact_factor")))
+            tiers.append(ranking_tier(journal_info.get("ranking")))
+            tier_members.setdefault(tiers[-1], []).append(i)
+            year_members.setdefault(year, []).append(i)
+            ranking_members.setdefault(journal_info.get("ranking") or "N/A", []).append(i)
+            type_members.setdefault(journal_info.get("type") or "未知", []).append(i)
+        self.impact_factors = impact_factors
+        self.ranking_tiers = tiers
+        self.sort_orders = build_sort_orders(years, impact_factors, tiers)
+        self.all_mask = (1 << n) - 1
+        self.year_masks = {year: bitset_from_indices(m, n) for year, m in year_members.items()}
+        self.ranking_masks = {r: bitset_from_indices(m, n) for r, m in ranking_members.items()}
+        self.tier_masks = {tier: bitset_from_indices(m, n) for tier, m in tier_members.items()}
+        self.type_masks = {t: bitset_from_indices(m, n) for t, m in type_members.items()}
+        self.dimension_index = DimensionIndex(papers)
+        self.search_index = SearchIndex(papers)
+        # 相关论文索引首次用到时才构建，见 related 属性
+        self._related = None
+        # 作者 -> 论文、合著关系图
+        self.author_index = AuthorIndex(papers)
+
+        # 每篇论文的内容哈希：卡片片段缓存和详情 ETag 以它为键
+        self.paper_hashes = [
+            hashlib.sha1(json.dumps(p, ensure_ascii=False).encode("utf-8")).hexdigest() for p in papers
+        ]
+        # id -> 下标，详情接口 O(1) 查找；重复 id 以第一篇为准
+        self.paper_ids = [paper.get("id") for paper in papers]
+        id_index = {}
+        for i, paper_id in enumerate(self.paper_ids):
+            id_index.setdefault(paper_id, i)
+        self.id_index = id_index
+        # 数据集版本：页面缓存与 ETag 都以它为键
+        digest = hashlib.sha1(json.dumps(stats, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        for content_hash in self.paper_hashes:
+            digest.update(content_hash.encode("ascii"))
+        self.version = digest.hexdigest()[:16]
+
+    @property
+    def related(self):
+        """每篇论文的 top-k 相关论文（/api/papers/<id>/related）
+
+        构建比快照里其余结构加起来还慢、峰值内存也高得多（bench.py 的 related_index 项），
+        所以不放进 build_snapshot：第一次访问时构建，之后一直复用；wsgi.py 在 fork 前预热。
+        """
+        if self._related is None:
+            with _related_lock:
+                if self._related is None:
+                    started = time.perf_counter()
+                    self._related = RelatedIndex(self.papers)
+                    logger.info("构建相关论文索引: %d 篇, %.3fs", len(self.papers), time.perf_counter() - started)
+        return self._related
+
+def filter_mask(snapshot, dimensions=None, years=None, rankings=None, types=None, max_tier=None):
+    """各筛选条件的位图取交集；未给出的条件不参与过滤"""
+    mask = snapshot.all_mask
+    if dimensions:
+        mask &= snapshot.dimension_index.mask(dimensions)
+    if years:
+        mask &= union(snapshot.year_masks.get(year, 0) for year in years)
+    if rankings:
+        mask &= union(snapshot.ranking_masks.get(ranking, 0) for ranking in rankings)
+    if types:
+        mask &= union(snapshot.type_masks.get(t, 0) for t in types)
+    if max_tier is not None:
+        mask &= union(m for tier, m in snapshot.tier_masks.items() if tier <= max_tier)
+    return mask
+
+def _counts(masks, scope):
+    counts = {}
+    for value, mask in masks.items():
+        count = (mask & scope).bit_count()
+        if count:
+            counts[value] = count
+    return counts
+
+def facet_counts(snapshot, dim_limit=50, **filters):
+    """分面计数：年份、级别、类型、信任维度
+
+    每个分面在“除自身以外”的筛选条件下计数（多选分面的常见做法），
+    每个取值只是一次位图与运算加 popcount，不扫描论文。
+    """
+    def scope_without(name):
+        return filter_mask(snapshot, **{**filters, name: None})
+
+    dimension_counts = _counts(snapshot.dimension_index.key_masks, scope_without("dimensions"))
+    top_dimensions = heapq.nlargest(dim_limit, dimension_counts.items(), key=lambda item: item[1])
+    return {
+        "total": filter_mask(snapshot, **filters).bit_count(),
+        "year": _counts(snapshot.year_masks, scope_without("years")),
+        "ranking": _counts(snapshot.ranking_masks, scope_without("rankings")),
+        "type": _counts(snapshot.type_masks, scope_without("types")),
+        # 列表保持按计数降序（dict 在 jsonify 时会被按键排序）
+        "dimension": [{"dimension": k, "count": c} for k, c in top_dimensions],
+        "unique_dimensions": len(dimension_counts),
+    }
+
+def query(snapshot, sort="default", mask=None, offset=0, limit=None):
+    """按预计算的排序顺序取出命中位图的一页下标，返回 (下标列表, 命中总数)"""
+    order = snapshot.sort_orders[sort]
+    if mask is None or mask == snapshot.all_mask:
+        total = len(order)
+        stop = total if limit is None else offset + limit
+        return list(order[offset:stop]), total
+    total = mask.bit_count()
+    wanted = total if limit is None else min(total, offset + limit)
+    members = bitset_bytes(mask, len(order))
+    hits = []
+    for i in order:
+        if members[i >> 3] >> (i & 7) & 1:
+            hits.append(i)
+            if len(hits) >= wanted:
+                break
+    return hits[offset:], total
+
+def search(snapshot, text, mask=None, offset=0, limit=20, pdf_index=None):
+    """BM25 检索，可叠加筛选位图，返回 ([(下标, 分数)], 命中总数)
+
+    给出 pdf_index 时，论文引用的 PDF 中得分最高一页的分数乘以 PDF_SCORE_WEIGHT
+    加到该论文上，只在 PDF 正文里命中的论文也会进入结果。
+    """
+    members = None
+    if mask is not None and mask != snapshot.all_mask:
+        members = bitset_bytes(mask, len(snapshot.papers))
+    if pdf_index is None or not pdf_index.pages:
+        top, total = snapshot.search_index.search(text, offset + limit, members)
+        return top[offset:], total
+    scores = dict(snapshot.search_index.search(text, len(snapshot.papers), members)[0])
+    for paper_id, score in pdf_index.paper_scores(text).items():
+        i = snapshot.id_index.get(paper_id)
+        if i is None or (members is not None and not members[i >> 3] >> (i & 7) & 1):
+            continue
+        scores[i] = scores.get(i, 0.0) + PDF_SCORE_WEIGHT * score
+    top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+    return top[offset:], len(scores)
+
+def build_snapshot(path=None, allow_partial=True):
+    """读取源文件；内容与缓存一致时直接加载处理好的快照，否则解析并建索引后写回缓存
+
+    单条记录损坏时跳过该记录；文件被截断时 allow_partial=False 会抛 ValueError，
+    热更新用它避免把写到一半的文件换上线。
+    """
+    if path is None:
+        path = resolve_source()
+    if path is None:
+        return Snapshot([], {})
+    started = time.perf_counter()
+    signature = source_signature(path)
+    digest = file_digest(path)
+    variant = "compact" if COMPACT_PAPERS else ""
+    if SNAPSHOT_CACHE_DIR:
+        snapshot = snapshot_cache.load(SNAPSHOT_CACHE_DIR, digest, variant)
+        if snapshot is not None:
+            snapshot.signature = signature
+            logger.info("从缓存加载文献快照: %d 篇, %.3fs", len(snapshot.papers), time.perf_counter() - started)
+            return snapshot
+    corpus, store = read_corpus(path)
+    if not corpus.complete and not allow_partial:
+        if store is not None:
+            store.close()
+        raise ValueError(f"{path} 不完整，已读到 {len(corpus.papers)} 篇")
+    papers = CompactStore(corpus.papers) if COMPACT_PAPERS else corpus.papers
+    corpus.papers = None
+    snapshot = Snapshot(papers, corpus.stats, signature, corpus.errors)
+    if store is not None and not COMPACT_PAPERS:
+        # 索引建好后不再常驻解码后的 dict，单篇读取经 mmap 只解码对应的一行
+        snapshot.papers = store
+    logger.info("解析并索引文献: %d 篇 (跳过 %d 条), %.3fs",
+                len(papers), len(corpus.errors), time.perf_counter() - started)
+    # 不完整的文件可能还在写入，不缓存
+    if SNAPSHOT_CACHE_DIR and corpus.complete:
+        snapshot_cache.store(SNAPSHOT_CACHE_DIR, digest, snapshot, variant)
+    return snapshot
+
+_current = build_snapshot()
+_failed_signature = None
+_swap_lock = threading.Lock()
+
+def current_snapshot():
+    return _current
+
+def reload_if_changed():
+    """源文件变化时重建快照并原子替换，返回是否发生了替换"""
+    global _current, _failed_signature
+    signature = source_signature(resolve_source())
+    if signature == _current.signature or signature == _failed_signature:
+        return False
+    with _swap_lock:
+        if signature == _current.signature:
+            return False
+        # 构建期间旧快照继续服务请求，新快照完整构建后才替换引用
+        try:
+            snapshot = build_snapshot(signature[0] if signature else None, allow_partial=False)
+        except Exception:
+            _failed_signature = signature
+            raise
+        _current = snapshot
+    logger.info("文献快照已更新: %d 篇, 版本 %s", len(snapshot.papers), snapshot.version)
+    # 在监听线程里同步 SQLite，不让请求承担导入耗时
+    sqlite_backend(snapshot)
+    return True
+
+_sqlite = None
+_sqlite_version = None
+_sqlite_lock = threading.Lock()
+
+def sqlite_backend(snapshot):
+    """未启用时返回 None；否则确保库里是当前快照的数据后返回 SqliteStore
+
+    只有当前快照会触发导入，仍持有旧快照的请求直接查询（可能已是新数据）。
+    库里记录的版本与快照一致时（例如重启后）不重复导入。
+    """
+    global _sqlite, _sqlite_version
+    if not SQLITE_PATH:
+        return None
+    if _sqlite_version == snapshot.version or (_sqlite is not None and snapshot is not _current):
+        return _sqlite
+    with _sqlite_lock:
+        if _sqlite is None:
+            _sqlite = SqliteStore(SQLITE_PATH, RANKING_TIERS, UNRANKED_TIER, parse_impact_factor)
+        if _sqlite_version != snapshot.version and snapshot is _current:
+            if _sqlite.version() != snapshot.version:
+                started = time.perf_counter()
+                count = _sqlite.import_papers(snapshot.papers, snapshot.version)
+                logger.info("已导入 SQLite: %d 篇, %.3fs", count, time.perf_counter() - started)
+            _sqlite_version = snapshot.version
+    return _sqlite
+
+class SnapshotWatcher(threading.Thread):
+    """后台轮询源文件 mtime/size，变化后重建快照"""
+
+    def __init__(self, interval=RELOAD_INTERVAL):
+        super().__init__(name="paper-snapshot-watcher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                reload_if_changed()
+            except Exception:
+                # 文件写到一半或格式错误时保留旧快照，等文件再次变化后重试
+                logger.exception("重新加载文献失败，继续使用旧快照")
+
+    def stop(self):
+        self._stop_event.set()
+
+_watcher = None
+
+def start_watcher(interval=RELOAD_INTERVAL):
+    global _watcher
+    if _watcher is None and interval > 0:
+        _watcher = SnapshotWatcher(interval)
+        _watcher.start()
+    return _watcher
+
+_pdf_indexer = None
+
+def start_pdf_indexer(interval=RELOAD_INTERVAL):
+    """启动后台 PDF 抽取与索引线程；未安装 pypdf 时返回 None"""
+    global _pdf_indexer
+    if _pdf_indexer is None and pdf_text.available():
+        _pdf_indexer = pdf_text.PdfIndexer(current_snapshot, LITERATURE_DIR, PDF_TEXT_CACHE_DIR,
+                                           PDF_WORKERS, max(interval, 1.0))
+        _pdf_indexer.start()
+    return _pdf_indexer
+
+def current_pdf_index():
+    """最近一次建好的 PDF 索引；未启用或尚未建好时返回 None"""
+    return _pdf_indexer.index if _pdf_indexer is not None else None
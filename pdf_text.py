@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""PDF 全文抽取与检索
+
+论文的 file / journal_info.file_path 指向的 PDF 在后台进程池里逐页抽取文本，
+结果按 PDF 内容的 sha1 缓存到磁盘，文件不变就不会重复抽取。抽出的页面
+建成一个 BM25 索引（复用 search_index），检索结果精确到页，并带上引用该
+PDF 的论文 id 和一小段上下文。/api/search 也会把 PDF 正文的得分并入论文的
+相关度（见 paper_store.search），只命中正文的论文同样会出现在结果里。
+
+依赖 pypdf（可选）；未安装时 available() 为 False，不建立 PDF 索引。
+
+    python pdf_text.py papers.json "trust model"
+
+抽取语料引用的全部 PDF 并打印检索结果。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from search_index import SearchIndex, tokenize
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf 为可选依赖，缺失时不建立 PDF 全文索引
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式变化时递增
+CACHE_VERSION = 1
+# 检索结果里上下文片段的长度（字符）
+SNIPPET_CHARS = 160
+# 被超过这么多篇论文引用的 PDF 视为占位文件，正文得分不并入论文检索
+MAX_PAPERS_PER_PDF = 5
+
+def available():
+    return PdfReader is not None
+
+def referenced_files(papers):
+    """语料引用的 PDF 相对路径 -> 引用它的论文 id 列表（保持首次出现的顺序）"""
+    files = {}
+    for paper in papers:
+        paths = (paper.get("file"), (paper.get("journal_info") or {}).get("file_path"))
+        for path in dict.fromkeys(p for p in paths if isinstance(p, str) and p.lower().endswith(".pdf")):
+            files.setdefault(path, []).append(paper.get("id"))
+    return files
+
+def resolve(base_dir, path):
+    """相对路径按 base_dir 解析，越出 base_dir 或文件不存在时返回 None"""
+    base = os.path.realpath(base_dir)
+    full = os.path.realpath(os.path.join(base, path))
+    if os.path.commonpath([base, full]) != base or not os.path.isfile(full):
+        return None
+    return full
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extract_pages(path):
+    """逐页抽取文本（在工作进程里执行）；无法解析的文件返回空列表"""
+    # pypdf 对缺字体等问题逐条打 warning，工作进程里只保留错误
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    try:
+        reader = PdfReader(path)
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception:
+                pages.append("")
+        return pages
+    except Exception as e:
+        logger.warning("无法解析 PDF %s: %s", path, e)
+        return []
+
+class TextCache:
+    """<cache_dir>/<sha1>.json.gz，内容为逐页文本"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, f"v{CACHE_VERSION}-{digest}.json.gz")
+
+    def load(self, digest):
+        try:
+            with gzip.open(self.path(digest), "rt", encoding="utf-8") as f:
+                return json.load(f)["pages"]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("PDF 文本缓存损坏，重新抽取: %s", digest)
+            return None
+
+    def store(self, digest, pages):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(digest)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"pages": pages}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+def extract_all(paths, cache, workers=None):
+    """绝对路径列表 -> {路径: 逐页文本}；命中缓存的不再抽取，其余在进程池里并行抽取"""
+    digests = {path: file_sha1(path) for path in paths}
+    results = {}
+    missing = {}
+    for path, digest in digests.items():
+        pages = cache.load(digest)
+        if pages is None:
+            # 内容相同的副本只抽一次
+            missing.setdefault(digest, path)
+        else:
+            results[path] = pages
+    if missing:
+        started = time.perf_counter()
+        todo = list(missing.items())
+        if workers == 1 or len(todo) == 1:
+            extracted = [extract_pages(path) for _, path in todo]
+        else:
+            # spawn：服务进程里有其他线程，fork 出的子进程可能继承到被持有的锁
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(todo)),
+                                     mp_context=context) as pool:
+                extracted = list(pool.map(extract_pages, [path for _, path in todo]))
+        by_digest = {}
+        for (digest, _), pages in zip(todo, extracted):
+            cache.store(digest, pages)
+            by_digest[digest] = pages
+        for path, digest in digests.items():
+            if digest in by_digest:
+                results[path] = by_digest[digest]
+        logger.info("抽取 PDF 文本: %d 个文件, %.3fs", len(todo), time.perf_counter() - started)
+    return results
+
+class PdfIndex:
+    """按页建立的 PDF 全文索引，构建后只读"""
+
+    def __init__(self, files=None, texts=None):
+        # files: 相对路径 -> 论文 id 列表；texts: 相对路径 -> 逐页文本
+        self.pages = []
+        for path, pages in (texts or {}).items():
+            for number, text in enumerate(pages, 1):
+                if text.strip():
+                    self.pages.append((path, number, text))
+        self.files = files or {}
+        self.indexed_files = len(texts or {})
+        self.search_index = SearchIndex([{"abstract": text} for _, _, text in self.pages])
+
+    def search(self, text, limit=20):
+        """返回 ([{file, page, score, paper_ids, snippet}], 命中页数)"""
+        top, total = self.search_index.search(text, limit)
+        hits = []
+        for doc_id, score in top:
+            path, number, page_text = self.pages[doc_id]
+            hits.append({
+                "file": path,
+                "page": number,
+                "score": round(score, 4),
+                "paper_ids": self.files.get(path, []),
+                "snippet": snippet(page_text, text),
+            })
+        return hits, total
+
+    def paper_scores(self, text):
+        """论文 id -> 它引用的 PDF 中得分最高一页的分数（跳过被大量论文共用的占位 PDF）"""
+        top, _ = self.search_index.search(text, len(self.pages))
+        scores = {}
+        for doc_id, score in top:
+            paper_ids = self.files.get(self.pages[doc_id][0], ())
+            if len(paper_ids) > MAX_PAPERS_PER_PDF:
+                continue
+            for paper_id in paper_ids:
+                if score > scores.get(paper_id, 0.0):
+                    scores[paper_id] = score
+        return scores
+
+def snippet(page_text, query):
+    """取第一个查询词附近的一段文字；词干化后的词可能找不到原文，退回到页首"""
+    flat = re.sub(r"\s+", " ", page_text).strip()
+    lowered = flat.lower()
+    position = -1
+    for term in tokenize(query):
+        position = lowered.find(term)
+        if position >= 0:
+            break
+    start = max(0, position - SNIPPET_CHARS // 3) if position >= 0 else 0
+    return flat[start:start + SNIPPET_CHARS]
+
+def build_index(papers, base_dir, cache_dir, workers=None, files=None):
+    if files is None:
+        files = referenced_files(papers)
+    resolved = {path: resolve(base_dir, path) for path in files}
+    for path, full in resolved.items():
+        if full is None:
+            logger.warning("找不到论文引用的 PDF: %s", path)
+    texts = extract_all([full for full in resolved.values() if full], TextCache(cache_dir), workers)
+    return PdfIndex(files, {path: texts[full] for path, full in resolved.items() if full in texts})
+
+def file_signature(files, base_dir):
+    """引用的 PDF 的 (路径, mtime_ns, size)，用于判断是否需要重建；files 为 referenced_files 的结果"""
+    signature = []
+    for path in files:
+        full = resolve(base_dir, path)
+        if full is not None:
+            st = os.stat(full)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+class PdfIndexer(threading.Thread):
+    """后台线程：快照版本或 PDF 文件变化时重建 PDF 索引并整体替换"""
+
+    def __init__(self, get_snapshot, base_dir, cache_dir, workers=None, interval=5.0):
+        super().__init__(name="pdf-text-indexer", daemon=True)
+        self.get_snapshot = get_snapshot
+        self.base_dir = base_dir
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.interval = interval
+        self.index = None
+        self._built_for = None
+        # (快照版本, referenced_files 结果)：只在快照换代时遍历一次语料，
+        # 之后每次轮询只 stat PDF 文件（JSONL / 压缩存储下遍历会逐篇解码）
+        self._files = (None, None)
+        self._stop_event = threading.Event()
+
+    def refresh(self):
+        snapshot = self.get_snapshot()
+        version, files = self._files
+        if version != snapshot.version:
+            files = referenced_files(snapshot.papers)
+            self._files = (snapshot.version, files)
+        key = (snapshot.version, file_signature(files, self.base_dir))
+        if key == self._built_for:
+            return False
+        started = time.perf_counter()
+        index = build_index(snapshot.papers, self.base_dir, self.cache_dir, self.workers, files)
+        self.index = index
+        self._built_for = key
+        logger.info("PDF 索引已更新: %d 个文件 %d 页, %.3fs",
+                    index.indexed_files, len(index.pages), time.perf_counter() - started)
+        return True
+
+    def run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("建立 PDF 索引失败，稍后重试")
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+
+if __name__ == "__main__":
+    import argparse
+
+    import paper_store
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="抽取语料引用的 PDF 并检索")
+    parser.add_argument("src", nargs="?", default="papers.json")
+    parser.add_argument("query", nargs="?", default="trust")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if not available():
+        raise SystemExit("需要先安装 pypdf")
+    papers, _ = paper_store.load_papers(args.src)
+    base_dir = os.path.dirname(os.path.abspath(args.src))
+    index = build_index(papers, base_dir, os.path.join(base_dir, ".pdf_text_cache"), args.workers)
+    hits, total = index.search(args.query, 10)
+    print(f"📄 {index.indexed_files} 个 PDF, {len(index.pages)} 页; 命中 {total} 页")
+    for hit in hits:
+        print(f"  {hit['file']} p.{hit['page']} ({hit['score']}): {hit['snippet']}")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""按需剖析单个请求
+
+设置 CLAWPAPER_PROFILE=1 后，请求带上 ?_profile=1（或请求头 X-Clawpaper-Profile: 1）
+时整个请求（包括流式响应的生成过程）在 cProfile 下运行，结果写成 .pstats；
+_profile=sample 则改用采样，按固定间隔抓取处理线程的调用栈，写成可直接喂给
+flamegraph.pl / speedscope 的 collapsed stacks。文件名通过响应头 X-Clawpaper-Profile
+返回，可从 /debug/profiles/<name> 下载。未开启时中间件不挂载，没有额外开销。
+首页冷渲染平时在后台线程里进行，被剖析的请求改为在自己的线程里渲染，结果才包含卡片渲染。
+
+快照构建在后台线程里进行，不属于任何请求，用命令行单独剖析：
+
+    python profiling.py papers.json            # cProfile build_snapshot，打印最耗时的函数
+    python profiling.py papers.json --sample   # 采样，写 collapsed stacks
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+from paper_store import LITERATURE_DIR
+
+PROFILE_ENABLED = os.environ.get("CLAWPAPER_PROFILE", "") == "1"
+PROFILE_DIR = os.environ.get("CLAWPAPER_PROFILE_DIR", os.path.join(LITERATURE_DIR, ".profiles"))
+# 目录里最多保留的剖析文件数，超出时删除最旧的
+MAX_PROFILES = 50
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 0.002
+
+PROFILE_HEADER = "X-Clawpaper-Profile"
+PROFILE_ARG = "_profile"
+
+def requested_mode(environ):
+    """请求要求的剖析方式：'cprofile'、'sample' 或 None"""
+    value = environ.get("HTTP_X_CLAWPAPER_PROFILE")
+    if value is None:
+        values = parse_qs(environ.get("QUERY_STRING", "")).get(PROFILE_ARG)
+        value = values[0] if values else None
+    if value is None or value.lower() in ("", "0", "false"):
+        return None
+    return "sample" if value.lower() == "sample" else "cprofile"
+
+def _frame_label(code):
+    # collapsed 格式用 ';' 分隔栈帧，最后一个空格后是计数
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+class StackSampler:
+    """后台线程定时抓取目标线程的调用栈，按 collapsed stacks 计数"""
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop_event.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class CProfileRun:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+def store_artifact(profiler, profile_dir, label, suffix):
+    """写入剖析文件并清理旧文件，返回文件名"""
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "index"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug[:40]}{suffix}"
+    tmp = os.path.join(profile_dir, f".{name}.tmp-{os.getpid()}")
+    profiler.dump(tmp)
+    os.replace(tmp, os.path.join(profile_dir, name))
+    artifacts = sorted(list_artifacts(profile_dir), key=lambda n: os.path.getmtime(os.path.join(profile_dir, n)))
+    for old in artifacts[:-MAX_PROFILES]:
+        try:
+            os.remove(os.path.join(profile_dir, old))
+        except OSError:
+            pass
+    return name
+
+def list_artifacts(profile_dir):
+    try:
+        names = os.listdir(profile_dir)
+    except FileNotFoundError:
+        return []
+    return [name for name in names if name.endswith((".pstats", ".collapsed"))]
+
+class ProfilingMiddleware:
+    """WSGI 中间件：被标记的请求在剖析器下完整执行（响应体先缓冲再返回）
+
+    cProfile 同一时刻只能有一个在运行，并发的剖析请求里只有第一个会被剖析，
+    其余照常处理并在响应头里标记 busy。
+    """
+
+    def __init__(self, wsgi_app, profile_dir=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        mode = requested_mode(environ)
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+        if not self._lock.acquire(blocking=False):
+            def start_busy(status, headers, exc_info=None):
+                return start_response(status, headers + [(PROFILE_HEADER, "busy")], exc_info)
+            return self.wsgi_app(environ, start_busy)
+        try:
+            return self._profiled(mode, environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _profiled(self, mode, environ, start_response):
+        captured = {}
+        body = []
+
+        def capture(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            captured["exc_info"] = exc_info
+            return body.append
+
+        profiler = StackSampler(interval=self.interval) if mode == "sample" else CProfileRun()
+        with profiler:
+            iterable = self.wsgi_app(environ, capture)
+            try:
+                for chunk in iterable:
+                    body.append(chunk)
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+        suffix = ".collapsed" if mode == "sample" else ".pstats"
+        name = store_artifact(profiler, self.profile_dir, environ.get("PATH_INFO", ""), suffix)
+        headers = [(k, v) for k, v in captured["headers"] if k.lower() != "content-length"]
+        headers.append(("Content-Length", str(sum(len(chunk) for chunk in body))))
+        headers.append((PROFILE_HEADER, name))
+        start_response(captured["status"], headers, captured["exc_info"])
+        return body
+
+if __name__ == "__main__":
+    import argparse
+    import pstats
+
+    import paper_store
+
+    parser = argparse.ArgumentParser(description="剖析一次快照构建（加载、聚合、建索引）")
+    parser.add_argument("src", nargs="?", default=None, help="默认与服务相同的语料文件")
+    parser.add_argument("--sample", action="store_true", help="采样并写 collapsed stacks，而不是 cProfile")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    # 关闭快照缓存，剖析的是完整的冷构建
+    paper_store.SNAPSHOT_CACHE_DIR = ""
+    src = args.src or paper_store.resolve_source()
+    if args.sample:
+        # 在新线程里构建，由采样线程抓取它的调用栈
+        worker = threading.Thread(target=paper_store.build_snapshot, args=(src,))
+        worker.start()
+        profiler = StackSampler(worker.ident)
+        with profiler:
+            worker.join()
+    else:
+        profiler = CProfileRun()
+        with profiler:
+            paper_store.build_snapshot(src)
+    name = store_artifact(profiler, PROFILE_DIR, "build_snapshot", ".collapsed" if args.sample else ".pstats")
+    path = os.path.join(PROFILE_DIR, name)
+    if args.sample:
+        # 按栈顶函数汇总样本数（即自身耗时）
+        leaves = Counter()
+        for stack, count in profiler.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        for leaf, count in leaves.most_common(args.top):
+            print(f"{count:6d} {leaf}")
+    else:
+        pstats.Stats(path).sort_stats("cumulative").print_stats(args.top)
+    print(f"📝 {path}")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""相关论文：信任维度 / 标签的 Jaccard 重合度 + 摘要 TF-IDF 余弦
+
+    score = 0.5 * cos(摘要) + 0.25 * J(信任维度) + 0.25 * J(标签)
+
+每个快照构建时为每篇论文算好 top-k 邻居，查询只是按下标取一段数组。
+相似度沿倒排表累加：只有至少共享一个特征的论文对才会被计算。出现在过半
+论文里（或超过 MAX_POSTINGS 篇）的特征区分度很低，当作停用词忽略，
+这也把大语料下的计算量限制在 特征数 x MAX_POSTINGS^2 以内。
+
+装有 numpy 时按行分块向量化累加，否则退回纯 Python 实现，两者结果一致。
+"""
+
+import heapq
+import math
+from array import array
+from collections import Counter
+
+from dimension_index import normalize_dimension
+from search_index import tokenize
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时用纯 Python 计算
+    np = None
+
+WEIGHTS = (0.5, 0.25, 0.25)
+# 每篇论文保留的邻居数
+TOP_K = 10
+# 文档频率超过 n * MAX_DF_RATIO 或 MAX_POSTINGS 的特征不参与计算
+MAX_DF_RATIO = 0.5
+MAX_POSTINGS = 1000
+# 每篇摘要只保留权重最高的若干个词
+TERMS_PER_PAPER = 64
+# numpy 分块时每块展开的论文对数上限（控制内存）
+BLOCK_PAIRS = 1 << 22
+
+def paper_features(paper):
+    """(摘要词频, 信任维度集合, 标签集合)"""
+    dims = {normalize_dimension(key) for key in (paper.get("trust_dimensions") or {})}
+    tags = {tag.strip().lower() for tag in (paper.get("tags") or []) if isinstance(tag, str) and tag.strip()}
+    return Counter(tokenize(paper.get("abstract") or "")), dims, tags
+
+def _vectors(papers):
+    """每篇论文三组稀疏特征 [{特征: 权重}]：TF-IDF（L2 归一化）、维度与标签（权重 1）"""
+    features = [paper_features(paper) for paper in papers]
+    n = len(features)
+    max_df = min(n * MAX_DF_RATIO, MAX_POSTINGS)
+    term_df = Counter(term for terms, _, _ in features for term in terms)
+    dim_df = Counter(dim for _, dims, _ in features for dim in dims)
+    tag_df = Counter(tag for _, _, tags in features for tag in tags)
+    # 只在一篇论文里出现的特征不会产生任何论文对
+    useful = lambda df: 2 <= df <= max_df
+    term_vectors, dim_vectors, tag_vectors = [], [], []
+    for terms, dims, tags in features:
+        weights = {
+            term: (1 + math.log(tf)) * (math.log((1 + n) / (1 + term_df[term])) + 1)
+            for term, tf in terms.items() if useful(term_df[term])
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        top = heapq.nlargest(TERMS_PER_PAPER, weights.items(), key=lambda item: (item[1], item[0]))
+        term_vectors.append({term: w / norm for term, w in top} if norm else {})
+        dim_vectors.append({dim: 1.0 for dim in dims if useful(dim_df[dim])})
+        tag_vectors.append({tag: 1.0 for tag in tags if useful(tag_df[tag])})
+    return term_vectors, dim_vectors, tag_vectors
+
+def _postings(vectors):
+    postings = {}
+    for i, vector in enumerate(vectors):
+        for feature, weight in vector.items():
+            postings.setdefault(feature, []).append((i, weight))
+    return postings
+
+def _jaccard(inter, size_a, size_b):
+    union = size_a + size_b - inter
+    return inter / union if union else 0.0
+
+def _top_neighbors_python(groups, k):
+    """纯 Python：逐篇沿倒排表累加三组相似度"""
+    n = len(groups[0])
+    postings = [_postings(vectors) for vectors in groups]
+    sizes = [[len(vector) for vector in vectors] for vectors in groups[1:]]
+    neighbors = []
+    for i in range(n):
+        sums = []
+        for vectors, index in zip(groups, postings):
+            acc = {}
+            for feature, weight in vectors[i].items():
+                for j, other in index[feature]:
+                    acc[j] = acc.get(j, 0.0) + weight * other
+            sums.append(acc)
+        cos, dim_inter, tag_inter = sums
+        scores = []
+        for j in set(cos) | set(dim_inter) | set(tag_inter):
+            if j == i:
+                continue
+            score = (WEIGHTS[0] * cos.get(j, 0.0)
+                     + WEIGHTS[1] * _jaccard(dim_inter.get(j, 0.0), sizes[0][i], sizes[0][j])
+                     + WEIGHTS[2] * _jaccard(tag_inter.get(j, 0.0), sizes[1][i], sizes[1][j]))
+            if score > 0:
+                scores.append((score, j))
+        neighbors.append(heapq.nlargest(k, scores, key=lambda item: (item[0], -item[1])))
+    return neighbors
+
+def _csr(vectors):
+    """把 [{特征: 权重}] 转成 CSR (indptr, 特征列号, 权重) 与按列的倒排 CSC (colptr, 行号, 权重)"""
+    columns = {}
+    indptr = [0]
+    cols = []
+    data = []
+    for vector in vectors:
+        for feature, weight in vector.items():
+            cols.append(columns.setdefault(feature, len(columns)))
+            data.append(weight)
+        indptr.append(len(cols))
+    indptr = np.asarray(indptr, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    data = np.asarray(data, dtype=np.float64)
+    rows = np.repeat(np.arange(len(vectors), dtype=np.int64), np.diff(indptr))
+    order = np.argsort(cols, kind="stable")
+    colptr = np.zeros(len(columns) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=len(columns)), out=colptr[1:])
+    return indptr, cols, data, colptr, rows[order], data[order]
+
+def _block_pairs(matrix, start, end, n):
+    """第 start..end 行与全部行共享特征的论文对：返回 (行号 * n + 列号, 权重乘积)，同一对可能出现多次"""
+    indptr, cols, data, colptr, post_rows, post_data = matrix
+    lo, hi = indptr[start], indptr[end]
+    entry_rows = np.repeat(np.arange(start, end, dtype=np.int64), np.diff(indptr[start:end + 1]))
+    entry_cols = cols[lo:hi]
+    lengths = colptr[entry_cols + 1] - colptr[entry_cols]
+    total = int(lengths.sum())
+    # 每个非零元展开成它所在列的整条倒排表
+    offsets = np.repeat(colptr[entry_cols] - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    keys = np.repeat(entry_rows, lengths) * n + post_rows[offsets]
+    return keys, np.repeat(data[lo:hi], lengths) * post_data[offsets]
+
+def _sum_pairs(pairs, start, cells):
+    """把重复的论文对合并：返回 (去重后的键, 每组特征的累加值)
+
+    论文对稠密时按整块 bincount 再取非零项，稀疏时对键排序去重，
+    避免大语料下为每块分配 行数 x n 的数组。
+    """
+    keys = np.concatenate([key for key, _ in pairs])
+    if len(keys) * 4 >= cells:
+        # 某组没有任何论文对时 bincount 返回整数数组，统一转成浮点
+        dense = [np.bincount(key - start, weights=values, minlength=cells).astype(np.float64)
+                 for key, values in pairs]
+        hit = np.flatnonzero(np.bincount(keys - start, minlength=cells))
+        return hit + start, [total[hit] for total in dense]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    sums = []
+    position = 0
+    for key, values in pairs:
+        sums.append(np.bincount(inverse[position:position + len(key)], weights=values,
+                                minlength=len(keys)).astype(np.float64))
+        position += len(key)
+    return keys, sums
+
+def _top_neighbors_numpy(groups, k):
+    """按行分块：展开共享特征的论文对，合并后打分，排序取每行 top-k"""
+    n = len(groups[0])
+    matrices = [_csr(vectors) for vectors in groups]
+    sizes = [np.diff(matrix[0]).astype(np.float64) for matrix in matrices[1:]]
+    # 每块的 行数 x n 与展开的论文对数都大致不超过 BLOCK_PAIRS
+    expanded = sum(int((colptr[cols + 1] - colptr[cols]).sum()) for _, cols, _, colptr, _, _ in matrices)
+    step = max(1, int(BLOCK_PAIRS / max(n, expanded / n)))
+    neighbors = []
+    for start in range(0, n, step):
+        end = min(start + step, n)
+        pairs = [_block_pairs(matrix, start, end, n) for matrix in matrices]
+        keys, sums = _sum_pairs(pairs, start * n, (end - start) * n)
+        rows, cols = np.divmod(keys, n)
+        score = WEIGHTS[0] * sums[0]
+        for weight, inter, size in ((WEIGHTS[1], sums[1], sizes[0]), (WEIGHTS[2], sums[2], sizes[1])):
+            union = size[rows] + size[cols] - inter
+            score += weight * np.divide(inter, union, out=np.zeros(len(inter)), where=union > 0)
+        keep = (rows != cols) & (score > 0)
+        rows, cols, score = rows[keep], cols[keep], score[keep]
+        if len(score) > (end - start) * k * 4 and n > k:
+            # 候选很多时先按每行第 k 大的分数筛一遍（同分全部保留），只对剩下的排序
+            dense = np.zeros((end - start, n))
+            dense[rows - start, cols] = score
+            threshold = np.partition(dense, n - k, axis=1)[:, n - k]
+            keep = score >= threshold[rows - start]
+            rows, cols, score = rows[keep], cols[keep], score[keep]
+        # 行号升序、分数降序、同分按下标升序，每行取前 k 个
+        order = np.lexsort((cols, -score, rows))
+        rows, cols, score = rows[order], cols[order], score[order]
+        firsts = np.searchsorted(rows, np.arange(start, end + 1))
+        for row in range(end - start):
+            lo = firsts[row]
+            hi = min(firsts[row + 1], lo + k)
+            neighbors.append([(float(score[p]), int(cols[p])) for p in range(lo, hi)])
+    return neighbors
+
+class RelatedIndex:
+    """每篇论文的 top-k 相关论文，构建后只读"""
+
+    def __init__(self, papers, k=TOP_K):
+        groups = _vectors(papers)
+        if not papers:
+            top = []
+        elif np is not None:
+            top = _top_neighbors_numpy(groups, k)
+        else:
+            top = _top_neighbors_python(groups, k)
+        self.k = k
+        # 第 i 篇的邻居在 offsets[i]:offsets[i+1]
+        self.offsets = array("i", [0])
+        self.neighbors = array("i")
+        self.scores = array("f")
+        for row in top:
+            for score, j in row:
+                self.neighbors.append(j)
+                self.scores.append(score)
+            self.offsets.append(len(self.neighbors))
+
+    def related(self, index, limit=None):
+        """返回 [(下标, 分数)]，按分数降序"""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [(self.neighbors[p], self.scores[p]) for p in range(start, end)]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""全文检索：中英混合分词 + BM25 排序
+
+中文（CJK）按相邻两字切成二元组，英文小写后去停用词并做轻量词干化。
+索引随快照构建一次，查询时只遍历查询词的倒排表。
+"""
+
+import functools
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+
+# 各字段权重（BM25F 的简化形式：加权词频、加权文档长度）
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "key_contributions": 1.5,
+    "abstract": 1.0,
+    "metrics": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# CJK 统一表意文字、扩展 A、兼容表意文字、日文假名、韩文音节
+_CJK_CLASS = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_TOKEN_RE = re.compile("[" + _CJK_CLASS + "]+|[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the their this
+to was were which with we our via using based towards toward
+""".split())
+
+# 后缀按长度从长到短尝试，剩余词干至少保留 3 个字符
+_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("iveness", "ive"),
+    ("ations", "ate"), ("ation", "ate"), ("iness", "y"), ("ness", ""), ("ments", ""), ("ment", ""),
+    ("ities", "ity"), ("ies", "y"), ("ing", ""), ("ed", ""), ("ly", ""), ("es", ""), ("s", ""),
+)
+
+@functools.lru_cache(maxsize=1 << 16)
+def stem(word):
+    """轻量英文词干化，只追求同一词的屈折变化能合并"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ss"):
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)] + replacement
+            break
+    # evaluate / evaluation / evaluating 归到同一个词干
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+def tokenize(text):
+    tokens = []
+    if not text:
+        return tokens
+    for run in _TOKEN_RE.findall(text.lower()):
+        # 英文片段只含 [a-z0-9]，首字符大于 'z' 即为 CJK 片段
+        if run[0] > "z":
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif len(run) > 1 and run not in STOPWORDS:
+            tokens.append(stem(run))
+    return tokens
+
+def paper_fields(paper):
+    """取出参与检索的各字段文本"""
+    metrics = (paper.get("evaluation_method") or {}).get("metrics") or []
+    return {
+        "title": paper.get("title") or "",
+        "tags": " ".join(paper.get("tags") or []),
+        "key_contributions": " ".join(paper.get("key_contributions") or []),
+        "abstract": paper.get("abstract") or "",
+        "metrics": " ".join(metrics) if isinstance(metrics, list) else str(metrics),
+    }
+
+class SearchIndex:
+    """BM25 倒排索引，构建后只读"""
+
+    def __init__(self, papers):
+        postings = {}
+        doc_lengths = array("f")
+        for doc_id, paper in enumerate(papers):
+            term_freqs = {}
+            length = 0.0
+            for field, text in paper_fields(paper).items():
+                weight = FIELD_WEIGHTS[field]
+                tokens = tokenize(text)
+                length += weight * len(tokens)
+                for token, count in Counter(tokens).items():
+                    term_freqs[token] = term_freqs.get(token, 0.0) + weight * count
+            doc_lengths.append(length)
+            for term, tf in term_freqs.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array("i"), array("f"))
+                entry[0].append(doc_id)
+                entry[1].append(tf)
+        self.size = len(papers)
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, (docs, _) in postings.items()
+        }
+
+    def search(self, text, limit=20, members=None):
+        """返回 ([(下标, 分数)], 命中总数)，按分数降序；members 为位图 bytes 时只保留其中的论文"""
+        terms = set(tokenize(text))
+        if not terms or not self.size:
+            return [], 0
+        scores = {}
+        doc_lengths = self.doc_lengths
+        norm = BM25_K1 / self.avg_length if self.avg_length else 0.0
+        for term in terms:
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            idf = self.idf[term]
+            docs, tfs = entry
+            for doc_id, tf in zip(docs, tfs):
+                if members is not None and not members[doc_id >> 3] >> (doc_id & 7) & 1:
+                    continue
+                denom = tf + BM25_K1 * (1 - BM25_B) + norm * BM25_B * doc_lengths[doc_id]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / denom
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return top, len(scores)
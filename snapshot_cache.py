@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""快照二进制缓存：把解析、聚合、建索引后的 Snapshot 整体 pickle 到磁盘
+
+缓存文件名包含格式版本和源文件内容的 sha1，源文件改动或代码里快照结构
+变化（改 FORMAT_VERSION）都会自然失效。缓存目录只应由本服务写入：
+pickle 反序列化等同于执行代码。
+"""
+
+import os
+import pickle
+import logging
+
+# Snapshot 或其索引结构变化时递增
+FORMAT_VERSION = 10
+
+logger = logging.getLogger(__name__)
+
+def cache_path(cache_dir, digest, variant=""):
+    suffix = "-" + variant if variant else ""
+    return os.path.join(cache_dir, f"snapshot-v{FORMAT_VERSION}-{digest[:16]}{suffix}.pickle")
+
+def load(cache_dir, digest, variant=""):
+    """命中返回 Snapshot，未命中或文件损坏返回 None"""
+    path = cache_path(cache_dir, digest, variant)
+    try:
+        with open(path, "rb") as f:
+            header, snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("快照缓存损坏，忽略: %s", path, exc_info=True)
+        return None
+    if header != {"format": FORMAT_VERSION, "digest": digest, "variant": variant}:
+        return None
+    return snapshot
+
+def store(cache_dir, digest, snapshot, variant=""):
+    """原子写入缓存，并清理同目录下的旧快照"""
+    path = cache_path(cache_dir, digest, variant)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        header = {"format": FORMAT_VERSION, "digest": digest, "variant": variant}
+        with open(tmp_path, "wb") as f:
+            pickle.dump((header, snapshot), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("写入快照缓存失败: %s", path, exc_info=True)
+        return None
+    keep = os.path.basename(path)
+    for name in os.listdir(cache_dir):
+        if name.startswith("snapshot-") and name.endswith(".pickle") and name != keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+    return path
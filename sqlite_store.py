@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""SQLite 存储引擎（可选，设置 CLAWPAPER_SQLITE 时启用）
+
+papers 表与 Next.js 端 src/lib/db.js 的定义完全一致，两边可以共用同一个
+data/papers.db。Python 端另外维护几张辅助表：
+
+- paper_documents: 原始 JSON 记录、journal_info.type 和在语料里的位置，接口返回的数据
+  与 JSON 源逐字段一致，默认排序按位置
+- paper_dimensions: 归一化后的信任维度键，维度筛选和分面用
+- papers_fts: FTS5 全文索引（标题、摘要），存的是 search_index.tokenize 的结果，
+  中文二元组和词干化规则与内存检索相同
+- clawpaper_meta: 已导入数据的快照版本
+
+筛选、排序、分页、检索和分面都翻译成 SQL 在库里执行。每个线程复用一个连接。
+papers.id 是主键，重复 id 只保留第一篇。
+
+star_rating、notes 等列由 Next.js 端写入（src/app/api/papers/mark），语料重新导入时
+papers 表只更新来自语料的列、删除语料里已经没有的行，不会清掉用户的评分和备注。
+
+    python sqlite_store.py papers.json data/papers.db
+
+把 JSON 语料导入到数据库。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from dimension_index import normalize_dimension
+from search_index import tokenize
+
+# 与 src/lib/db.js 相同
+PAPERS_SCHEMA = """
+  CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    authors TEXT,
+    year INTEGER,
+    venue TEXT,
+    abstract TEXT,
+    institution TEXT,
+    citations INTEGER DEFAULT 0,
+    ranking TEXT,
+    impact_factor REAL,
+    impact_factor_label TEXT,
+    publisher TEXT,
+    access_url TEXT,
+    doi TEXT,
+    bibtex TEXT,
+    file_path TEXT,
+    key_contributions TEXT,
+    evaluation_method TEXT,
+    trust_dimensions TEXT,
+    star_rating INTEGER DEFAULT 0,
+    notes TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+  )
+"""
+
+SCHEMA = PAPERS_SCHEMA + """;
+CREATE INDEX IF NOT EXISTS idx_papers_year ON papers(year);
+CREATE INDEX IF NOT EXISTS idx_papers_ranking ON papers(ranking);
+CREATE INDEX IF NOT EXISTS idx_papers_impact_factor ON papers(impact_factor);
+CREATE TABLE IF NOT EXISTS paper_documents (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    journal_type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_paper_documents_position ON paper_documents(position);
+CREATE INDEX IF NOT EXISTS idx_paper_documents_type ON paper_documents(journal_type);
+CREATE TABLE IF NOT EXISTS paper_dimensions (
+    paper_id TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    PRIMARY KEY (dimension, paper_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(title, abstract);
+CREATE TABLE IF NOT EXISTS clawpaper_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 检索时标题与摘要的 bm25 列权重，与 search_index.FIELD_WEIGHTS 一致
+FTS_WEIGHTS = (3.0, 1.0)
+
+# 只由 Python 端维护、每次导入整体重建的辅助表
+AUXILIARY_TABLES = ("paper_documents", "paper_dimensions", "papers_fts")
+
+# papers 表里来自语料的列（其余列如 star_rating、notes 归 Next.js 端）
+CORPUS_COLUMNS = (
+    "title", "authors", "year", "venue", "abstract", "institution", "citations",
+    "ranking", "impact_factor", "impact_factor_label", "publisher",
+    "access_url", "doi", "bibtex", "key_contributions", "evaluation_method", "trust_dimensions",
+)
+
+# d.position 即论文在语料里的顺序，作为默认排序和同值时的次序
+SORT_SQL = {
+    "default": "d.position",
+    "year_desc": "p.year DESC, d.position",
+    "year_asc": "p.year, d.position",
+    # 没有影响因子的论文无论升降序都排在最后
+    "if_desc": "p.impact_factor IS NULL, p.impact_factor DESC, d.position",
+    "if_asc": "p.impact_factor IS NULL, p.impact_factor, d.position",
+    "ranking": "tier, d.position",
+}
+
+def _tier_sql(ranking_tiers, unranked_tier):
+    cases = " ".join(f"WHEN '{ranking}' THEN {tier}" for ranking, tier in ranking_tiers.items())
+    return f"CASE p.ranking {cases} ELSE {unranked_tier} END"
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+class SqliteStore:
+    """按线程复用连接的只读查询接口；import_papers 在单独的事务里同步语料"""
+
+    def __init__(self, path, ranking_tiers, unranked_tier, parse_impact_factor):
+        self.path = path
+        self.ranking_tiers = ranking_tiers
+        self.unranked_tier = unranked_tier
+        self.parse_impact_factor = parse_impact_factor
+        self.tier_sql = _tier_sql(ranking_tiers, unranked_tier)
+        self._local = threading.local()
+        self._import_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(paper_documents)")]
+            if columns and "position" not in columns:
+                # 旧版辅助表没有 position：删掉重建，并清空版本号让下次强制重新导入
+                with conn:
+                    for table in AUXILIARY_TABLES:
+                        conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    conn.execute("DELETE FROM clawpaper_meta WHERE key = 'version'")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---- 导入 ----
+
+    def version(self):
+        row = self.connection().execute("SELECT value FROM clawpaper_meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def import_papers(self, papers, version):
+        """把库同步到这份语料，返回导入篇数（重复 id 只保留第一篇）
+
+        辅助表整体重建；papers 表按 id upsert 语料列，再删掉语料里已不存在的行，
+        Next.js 端写入的 star_rating、notes 保持不变。
+        """
+        with self._import_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    for table in AUXILIARY_TABLES:
+                        conn.execute(f"DELETE FROM {table}")
+                    count = 0
+                    seen = set()
+                    for paper in papers:
+                        paper_id = paper.get("id")
+                        if paper_id is None or paper_id in seen:
+                            continue
+                        seen.add(paper_id)
+                        self._insert(conn, paper, count)
+                        count += 1
+                    conn.execute("DELETE FROM papers WHERE id NOT IN (SELECT id FROM paper_documents)")
+                    conn.execute("INSERT OR REPLACE INTO clawpaper_meta (key, value) VALUES ('version', ?)", (version,))
+            finally:
+                conn.close()
+        return count
+
+    def _insert(self, conn, paper, position):
+        journal_info = paper.get("journal_info") or {}
+        year = paper.get("year")
+        # 列的写法与 db.js importFromJSON 相同，年份和影响因子先规范成数值，便于走索引
+        conn.execute(
+            f"""INSERT INTO papers (id, {", ".join(CORPUS_COLUMNS)})
+            VALUES (?, {_placeholders(CORPUS_COLUMNS)})
+            ON CONFLICT(id) DO UPDATE SET
+            {", ".join(f"{column} = excluded.{column}" for column in CORPUS_COLUMNS)}""",
+            (
+                paper["id"],
+                paper.get("title") or "",
+                json.dumps(paper.get("authors") or [], ensure_ascii=False),
+                year if isinstance(year, int) and not isinstance(year, bool) else None,
+                paper.get("venue"),
+                paper.get("abstract"),
+                paper.get("institution"),
+                paper.get("citations") or 0,
+                # 去掉首尾空白，max_tier 筛选才能直接按 ranking 索引查
+                (journal_info.get("ranking") or "").strip() or None,
+                self.parse_impact_factor(journal_info.get("impact_factor")),
+                journal_info.get("impact_factor_label") or None,
+                journal_info.get("publisher") or None,
+                journal_info.get("access_url") or None,
+                journal_info.get("doi") or None,
+                paper.get("bibtex") or None,
+                json.dumps(paper.get("key_contributions") or [], ensure_ascii=False),
+                json.dumps(paper.get("evaluation_method") or {}, ensure_ascii=False),
+                json.dumps(paper.get("trust_dimensions") or {}, ensure_ascii=False),
+            ),
+        )
+        # upsert 更新已有行时 lastrowid 不可靠，直接查
+        rowid = conn.execute("SELECT rowid FROM papers WHERE id = ?", (paper["id"],)).fetchone()[0]
+        conn.execute(
+            "INSERT INTO paper_documents (id, position, journal_type, data) VALUES (?, ?, ?, ?)",
+            (paper["id"], position, journal_info.get("type") or "未知", json.dumps(paper, ensure_ascii=False)),
+        )
+        dimensions = {normalize_dimension(key) for key in (paper.get("trust_dimensions") or {})}
+        conn.executemany(
+            "INSERT OR IGNORE INTO paper_dimensions (paper_id, dimension) VALUES (?, ?)",
+            [(paper["id"], dimension) for dimension in dimensions],
+        )
+        conn.execute(
+            "INSERT INTO papers_fts (rowid, title, abstract) VALUES (?, ?, ?)",
+            (rowid, " ".join(tokenize(paper.get("title") or "")), " ".join(tokenize(paper.get("abstract") or ""))),
+        )
+
+    # ---- 查询 ----
+
+    def _where(self, dimensions=None, years=None, rankings=None, types=None, max_tier=None):
+        """把筛选条件翻译成 WHERE 子句，语义与 paper_store.filter_mask 相同"""
+        clauses = []
+        params = []
+        for needle in dimensions or ():
+            # 子串匹配；用 instr 而不是 LIKE，维度键里的 '_' 不会被当成通配符
+            clauses.append("p.id IN (SELECT paper_id FROM paper_dimensions WHERE instr(dimension, ?) > 0)")
+            params.append(normalize_dimension(needle))
+        if years:
+            # 非整数年份按 0 归档
+            clause = f"p.year IN ({_placeholders(years)})"
+            if 0 in years:
+                clause = f"({clause} OR p.year IS NULL)"
+            clauses.append(clause)
+            params.extend(years)
+        if rankings:
+            clause = f"p.ranking IN ({_placeholders(rankings)})"
+            if "N/A" in rankings:
+                clause = f"({clause} OR p.ranking IS NULL)"
+            clauses.append(clause)
+            params.extend(rankings)
+        if types:
+            clauses.append(f"p.id IN (SELECT id FROM paper_documents WHERE journal_type IN ({_placeholders(types)}))")
+            params.extend(types)
+        if max_tier is not None and max_tier < self.unranked_tier:
+            # 按级别字符串过滤，可以走 ranking 索引
+            allowed = [r for r, tier in self.ranking_tiers.items() if tier <= max_tier]
+            if allowed:
+                clauses.append(f"p.ranking IN ({_placeholders(allowed)})")
+                params.extend(allowed)
+            else:
+                clauses.append("0")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _ordered(self, column, where, params, sort, offset, limit):
+        """按 sort 排序后取一页的单列结果"""
+        order = SORT_SQL[sort].replace("tier", self.tier_sql)
+        sql = (f"SELECT {column} FROM papers p JOIN paper_documents d ON d.id = p.id"
+               f"{where} ORDER BY {order} LIMIT ? OFFSET ?")
+        return [value for (value,) in self.connection().execute(sql, params + [-1 if limit is None else limit, offset])]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self.connection().execute(f"SELECT COUNT(*) FROM papers p{where}", params).fetchone()[0]
+
+    def query(self, sort="default", offset=0, limit=None, **filters):
+        """返回 (论文列表, 命中总数)；limit 为 None 时返回全部"""
+        where, params = self._where(**filters)
+        rows = self._ordered("d.data", where, params, sort, offset, limit)
+        return [json.loads(data) for data in rows], self.count(**filters)
+
+    def query_ids(self, sort="default", **filters):
+        """只取排好序的全部 id，返回 (id 列表, 命中总数)"""
+        where, params = self._where(**filters)
+        ids = self._ordered("p.id", where, params, sort, 0, None)
+        return ids, len(ids)
+
+    def _match_expression(self, text):
+        terms = dict.fromkeys(tokenize(text))
+        # 每个词加引号，避免被 FTS5 当成运算符或列名
+        return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def search(self, text, offset=0, limit=20, columns="d.data", **filters):
+        """FTS5 + bm25 检索，返回 ([(结果, 分数)], 命中总数)"""
+        match = self._match_expression(text)
+        if not match:
+            return [], 0
+        where, params = self._where(**filters)
+        where = (where + " AND" if where else " WHERE") + " papers_fts MATCH ?"
+        params = params + [match]
+        conn = self.connection()
+        source = ("FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+                  "JOIN paper_documents d ON d.id = p.id")
+        total = conn.execute(f"SELECT COUNT(*) {source}{where}", params).fetchone()[0]
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        # bm25() 越小越相关，取负后与内存检索一样按分数降序
+        rows = conn.execute(
+            f"SELECT {columns}, -bm25(papers_fts, {weights}) AS score {source}{where} "
+            f"ORDER BY score DESC, d.position LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset],
+        ).fetchall()
+        if columns == "d.data":
+            rows = [(json.loads(data), score) for data, score in rows]
+        return rows, total
+
+    def get_json(self, paper_id):
+        """单篇的原始 JSON 文本（与快照里 paper_hashes 的哈希输入相同），不存在返回 None"""
+        row = self.connection().execute("SELECT data FROM paper_documents WHERE id = ?", (paper_id,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, paper_id):
+        data = self.get_json(paper_id)
+        return None if data is None else json.loads(data)
+
+    def page(self, offset=0, limit=None):
+        """按导入顺序取一页，返回 (论文列表, 总数)"""
+        return self.query("default", offset, limit)
+
+    def facet_counts(self, dim_limit=50, **filters):
+        """分面计数，语义与 paper_store.facet_counts 相同（每个分面排除自身的筛选条件）"""
+        conn = self.connection()
+
+        def grouped(expression, name, join=""):
+            where, params = self._where(**{**filters, name: None})
+            sql = f"SELECT {expression}, COUNT(*) FROM papers p{join}{where} GROUP BY 1"
+            return dict(conn.execute(sql, params).fetchall())
+
+        where, params = self._where(**{**filters, "dimensions": None})
+        dimension_rows = conn.execute(
+            "SELECT pd.dimension, COUNT(*), MIN(d.position) FROM papers p "
+            "JOIN paper_documents d ON d.id = p.id "
+            f"JOIN paper_dimensions pd ON pd.paper_id = p.id{where} "
+            "GROUP BY pd.dimension ORDER BY 2 DESC, 3",
+            params,
+        ).fetchall()
+        return {
+            "total": self.count(**filters),
+            "year": grouped("COALESCE(p.year, 0)", "years"),
+            "ranking": grouped("COALESCE(p.ranking, 'N/A')", "rankings"),
+            "type": grouped("d.journal_type", "types", " JOIN paper_documents d ON d.id = p.id"),
+            "dimension": [{"dimension": k, "count": c} for k, c, _ in dimension_rows[:dim_limit]],
+            "unique_dimensions": len(dimension_rows),
+        }
+
+if __name__ == "__main__":
+    import argparse
+
+    import paper_store
+
+    parser = argparse.ArgumentParser(description="把 JSON / JSONL 语料导入 SQLite（与 src/lib/db.js 共用 papers 表）")
+    parser.add_argument("src", nargs="?", default="papers.json")
+    parser.add_argument("db", nargs="?", default=os.path.join("data", "papers.db"))
+    args = parser.parse_args()
+    papers, stats = paper_store.load_papers(args.src)
+    store = SqliteStore(args.db, paper_store.RANKING_TIERS, paper_store.UNRANKED_TIER,
+                        paper_store.parse_impact_factor)
+    count = store.import_papers(papers, paper_store.Snapshot(papers, stats).version)
+    print(f"✅ 成功导入 {count} 篇文献到 {args.db}")
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus_loader import load_corpus
+
+GOOD_A = json.dumps({"id": "a", "title": "信任评估 {括号} 与 \"引号\""}, ensure_ascii=False)
+BAD = '{"id": "bad", "title": "x", "year": }'
+GOOD_B = json.dumps({"id": "b", "title": "zero trust"})
+
+def document(*records):
+    return '{\n  "papers": [\n    ' + ",\n    ".join(records) + '\n  ],\n  "statistics": {"total_papers": 2}\n}\n'
+
+def write(tmp_path, text):
+    path = tmp_path / "papers.json"
+    data = text.encode("utf-8") if isinstance(text, str) else text
+    path.write_bytes(data)
+    return str(path), data
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 20])
+def test_garbled_record_is_skipped_with_its_byte_offset(tmp_path, chunk_size):
+    path, data = write(tmp_path, document(GOOD_A, BAD, GOOD_B))
+    corpus = load_corpus(path, chunk_size)
+    assert corpus.complete
+    assert [p["id"] for p in corpus.papers] == ["a", "b"]
+    assert corpus.stats == {"total_papers": 2}
+    # 偏移按字节计，前面的中文占 3 字节
+    assert [e["offset"] for e in corpus.errors] == [data.index(BAD.encode())]
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 20])
+def test_invalid_utf8_only_drops_that_record(tmp_path, chunk_size):
+    bad = b'{"id": "bad", "title": "\xff\xfe"}'
+    text = document(GOOD_A, "BAD", GOOD_B).encode("utf-8")
+    path, data = write(tmp_path, text.replace(b"BAD", bad))
+    corpus = load_corpus(path, chunk_size)
+    assert corpus.complete
+    assert [p["id"] for p in corpus.papers] == ["a", "b"]
+    assert [e["offset"] for e in corpus.errors] == [data.index(bad)]
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 20])
+def test_truncated_file_keeps_records_read_so_far(tmp_path, chunk_size):
+    text = document(GOOD_A, GOOD_B)
+    cut = text.encode("utf-8").index(b'"zero')
+    path, _ = write(tmp_path, text.encode("utf-8")[:cut])
+    corpus = load_corpus(path, chunk_size)
+    assert not corpus.complete
+    assert [p["id"] for p in corpus.papers] == ["a"]
+    # 错误指向未闭合记录的起点
+    assert [e["offset"] for e in corpus.errors] == [text.encode("utf-8").index(b'{"id": "b"')]
+
+def test_top_level_array(tmp_path):
+    path, _ = write(tmp_path, "[" + GOOD_A + ", " + GOOD_B + "]")
+    corpus = load_corpus(path)
+    assert corpus.complete
+    assert [p["id"] for p in corpus.papers] == ["a", "b"]
@@ -0,0 +1,58 @@
+import os
+import random
+import sys
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup_papers import NEAR_DUP_THRESHOLD, find_duplicates, jaccard, jaccard_at_least, shingles
+
+WORDS = ["tok" + a + b for a, b in product("abcdefgh", repeat=2)][:60]
+
+def text(replaced):
+    return " ".join(f"alt{i}" if i in replaced else word for i, word in enumerate(WORDS))
+
+def paper(paper_id, abstract, year=2024, doi=None):
+    record = {"id": paper_id, "title": "", "abstract": abstract, "year": year}
+    if doi:
+        record["journal_info"] = {"doi": doi}
+    return record
+
+def clusters(papers):
+    uf = find_duplicates([("test.json", p) for p in papers])[0]
+    return {frozenset(uf.cluster(i)) for i in range(len(papers))}
+
+def test_near_duplicate_chain_does_not_collapse_distinct_papers():
+    a, b, c = text(set()), text({10, 20}), text({10, 20, 40, 50})
+    # A~B、B~C 都达到阈值，A 与 C 却明显不同
+    assert jaccard(shingles(a), shingles(b)) >= NEAR_DUP_THRESHOLD
+    assert jaccard(shingles(b), shingles(c)) >= NEAR_DUP_THRESHOLD
+    assert jaccard(shingles(a), shingles(c)) < NEAR_DUP_THRESHOLD
+    assert clusters([paper("a", a), paper("b", b)]) == {frozenset({0, 1})}
+    assert clusters([paper("b", b), paper("c", c)]) == {frozenset({0, 1})}
+
+    result = clusters([paper("a", a), paper("b", b), paper("c", c)])
+    assert not any({0, 2} <= cluster for cluster in result)
+
+def test_identical_text_with_different_year_or_doi_is_not_merged():
+    body = text(set())
+    assert clusters([paper("a", body, 2020), paper("b", body, 2021)]) == {frozenset({0}), frozenset({1})}
+    assert clusters([
+        paper("a", body, doi="10.1000/example.0001"),
+        paper("b", body, doi="10.1000/example.0002"),
+    ]) == {frozenset({0}), frozenset({1})}
+
+def test_exact_copies_are_merged():
+    body = text({5})
+    assert clusters([paper("a", body), paper("a", body), paper("b", body)]) == {frozenset({0, 1, 2})}
+
+def test_early_exit_jaccard_matches_exact_value():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = set(rng.sample(range(40), rng.randint(0, 30)))
+        b = set(rng.sample(range(40), rng.randint(0, 30)))
+        for threshold in (0.5, NEAR_DUP_THRESHOLD, 0.95):
+            exact = jaccard(a, b)
+            assert jaccard_at_least(a, b, threshold) == (exact if exact >= threshold else 0.0)
+    # 恰好等于阈值的也算达标
+    assert jaccard_at_least(set(range(8)), set(range(10)), 0.8) == 0.8
@@ -0,0 +1,80 @@
+import json
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsonl_store import JsonlStore, convert, load_jsonl
+
+PAPERS = [{"id": f"p{i}", "title": f"论文 {i}", "year": 2020 + i} for i in range(3)]
+
+def lines(papers):
+    return b"".join(json.dumps(p, ensure_ascii=False).encode("utf-8") + b"\n" for p in papers)
+
+def write(tmp_path, data):
+    path = tmp_path / "papers.jsonl"
+    path.write_bytes(data)
+    return str(path)
+
+def load(path):
+    corpus, store = load_jsonl(path)
+    store.close()
+    return corpus
+
+def test_complete_file(tmp_path):
+    corpus = load(write(tmp_path, lines(PAPERS)))
+    assert corpus.complete
+    assert corpus.papers == PAPERS
+    assert corpus.errors == []
+
+def test_last_line_without_newline_is_incomplete(tmp_path):
+    data = lines(PAPERS)[:-1]
+    corpus = load(write(tmp_path, data))
+    # 最后一行本身能解析，但没有换行符，可能还在写入
+    assert not corpus.complete
+    assert corpus.papers == PAPERS
+
+def test_cut_off_last_line_is_incomplete(tmp_path):
+    data = lines(PAPERS)
+    data = data[:len(data) - 10]
+    corpus = load(write(tmp_path, data))
+    assert not corpus.complete
+    assert corpus.papers == PAPERS[:2]
+    assert [e["offset"] for e in corpus.errors] == [len(lines(PAPERS[:2]))]
+
+def test_garbled_middle_line_is_skipped(tmp_path):
+    data = lines(PAPERS[:1]) + b'{"id": "bad",\n' + lines(PAPERS[1:])
+    corpus = load(write(tmp_path, data))
+    assert corpus.complete
+    assert corpus.papers == PAPERS
+    assert [e["offset"] for e in corpus.errors] == [len(lines(PAPERS[:1]))]
+
+def test_incomplete_flag_survives_saved_index_and_pickle(tmp_path):
+    path = write(tmp_path, lines(PAPERS)[:-1])
+    JsonlStore(path).close()
+    # 第二次从 .idx 读取，不再扫描数据文件
+    store = JsonlStore(path)
+    assert not store.complete
+    restored = pickle.loads(pickle.dumps(store))
+    assert not restored.complete
+    assert restored.get("p1") == PAPERS[1]
+    store.close()
+    restored.close()
+
+def test_appending_the_missing_newline_makes_it_complete(tmp_path):
+    path = write(tmp_path, lines(PAPERS)[:-1])
+    assert not load(path).complete
+    with open(path, "ab") as f:
+        f.write(b"\n")
+    assert load(path).complete
+
+def test_convert_writes_a_complete_store(tmp_path):
+    src = tmp_path / "papers.json"
+    src.write_text(json.dumps({"papers": PAPERS, "statistics": {"total_papers": 3}}), encoding="utf-8")
+    dst = str(tmp_path / "out.jsonl")
+    assert convert(str(src), dst) == (3, [])
+    corpus = load(dst)
+    assert corpus.complete
+    assert corpus.papers == PAPERS
+    assert corpus.stats == {"total_papers": 3}
@@ -0,0 +1,36 @@
+import os
+import pstats
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as webapp
+from profiling import PROFILE_HEADER, ProfilingMiddleware
+
+def profiled_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(webapp, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(webapp.app, "wsgi_app", ProfilingMiddleware(webapp.app.wsgi_app, str(tmp_path)))
+    # 冷缓存：首页与卡片都要重新渲染
+    monkeypatch.setattr(webapp, "_RENDER_CACHE", {})
+    monkeypatch.setattr(webapp, "_CARD_CACHE", {})
+    return webapp.app.test_client()
+
+def test_cold_index_render_is_inside_the_profile(monkeypatch, tmp_path):
+    client = profiled_client(monkeypatch, tmp_path)
+    resp = client.get("/?_profile=1")
+    assert resp.status_code == 200
+    name = resp.headers[PROFILE_HEADER]
+    assert name.endswith(".pstats")
+    functions = {func for _, _, func in pstats.Stats(str(tmp_path / name)).stats}
+    assert "render_card" in functions
+    assert "iter_index_html" in functions
+    # 渲染结果照常进入缓存，下一次请求直接命中
+    assert len(webapp._RENDER_CACHE) == 1
+
+def test_cached_index_is_served_without_rendering(monkeypatch, tmp_path):
+    client = profiled_client(monkeypatch, tmp_path)
+    body = client.get("/").data
+    resp = client.get("/?_profile=1")
+    assert resp.data == body
+    functions = {func for _, _, func in pstats.Stats(str(tmp_path / resp.headers[PROFILE_HEADER])).stats}
+    assert "render_card" not in functions
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import related_index
+from related_index import RelatedIndex
+
+TOPICS = ["trust calibration", "explainable agents", "robot safety", "privacy attacks"]
+
+def corpus(with_tags=True):
+    papers = []
+    for i in range(40):
+        topic = TOPICS[i % len(TOPICS)]
+        paper = {"id": f"p{i}", "abstract": f"{topic} study number {i % 7} with {topic} results"}
+        # 一部分论文没有标签和信任维度
+        if i % 3:
+            paper["trust_dimensions"] = {topic.split()[0]: 1, "reliability": 1} if i % 2 else {}
+            if with_tags:
+                paper["tags"] = [topic, f"group{i % 5}"]
+        papers.append(paper)
+    return papers
+
+def build_both(papers, monkeypatch):
+    fast = RelatedIndex(papers)
+    monkeypatch.setattr(related_index, "np", None)
+    slow = RelatedIndex(papers)
+    return fast, slow
+
+@pytest.mark.skipif(related_index.np is None, reason="需要 numpy")
+@pytest.mark.parametrize("with_tags", [True, False])
+def test_numpy_and_python_give_same_neighbors(with_tags, monkeypatch):
+    papers = corpus(with_tags)
+    fast, slow = build_both(papers, monkeypatch)
+    assert len(fast.neighbors) > 0
+    assert list(fast.offsets) == list(slow.offsets)
+    assert list(fast.neighbors) == list(slow.neighbors)
+    assert list(fast.scores) == pytest.approx(list(slow.scores))
+
+@pytest.mark.skipif(related_index.np is None, reason="需要 numpy")
+def test_corpus_without_any_tags_or_dimensions(monkeypatch):
+    papers = [{"id": f"p{i}", "abstract": f"{TOPICS[i % 2]} paper"} for i in range(4)]
+    papers.append({"id": "empty", "abstract": ""})
+    fast, slow = build_both(papers, monkeypatch)
+    assert list(fast.neighbors) == list(slow.neighbors)
+    assert fast.related(4) == []
+    assert [j for j, _ in fast.related(0)] == [2]
+
+def test_sparse_blocks_match_dense_blocks(monkeypatch):
+    papers = corpus()
+    full = RelatedIndex(papers)
+    # 块很小时走稀疏去重分支
+    monkeypatch.setattr(related_index, "BLOCK_PAIRS", 1)
+    small = RelatedIndex(papers)
+    assert list(full.neighbors) == list(small.neighbors)
+
+def test_snapshot_builds_related_index_on_first_use():
+    from paper_store import Snapshot
+
+    snapshot = Snapshot(corpus(), {})
+    assert snapshot._related is None
+    related = snapshot.related
+    assert snapshot.related is related
+    assert list(related.neighbors) == list(RelatedIndex(snapshot.papers).neighbors)
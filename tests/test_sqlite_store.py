@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paper_store import RANKING_TIERS, UNRANKED_TIER, parse_impact_factor
+from sqlite_store import SqliteStore
+
+def paper(paper_id, title, year=2024, dims=("security",)):
+    return {
+        "id": paper_id, "title": title, "abstract": f"{title} abstract", "year": year,
+        "journal_info": {"ranking": "SCI Q1", "type": "journal"},
+        "trust_dimensions": {dim: "" for dim in dims},
+    }
+
+def open_store(tmp_path):
+    return SqliteStore(str(tmp_path / "papers.db"), RANKING_TIERS, UNRANKED_TIER, parse_impact_factor)
+
+def mark(store, paper_id, rating, notes):
+    # 模拟 Next.js 端 /api/papers/mark 的写入
+    conn = store.connection()
+    with conn:
+        conn.execute("UPDATE papers SET star_rating = ?, notes = ? WHERE id = ?", (rating, notes, paper_id))
+
+def marks(store):
+    rows = store.connection().execute("SELECT id, star_rating, notes FROM papers ORDER BY id")
+    return {paper_id: (rating, notes) for paper_id, rating, notes in rows}
+
+def test_reimport_keeps_ratings_and_notes(tmp_path):
+    store = open_store(tmp_path)
+    assert store.import_papers([paper("a", "alpha"), paper("b", "beta"), paper("c", "gamma")], "v1") == 3
+    mark(store, "a", 5, "必读")
+    mark(store, "b", 3, "remove me")
+
+    # 新语料：a 改了标题和维度，b 被删掉，d 是新增的，顺序也变了
+    corpus = [paper("d", "delta"), paper("a", "alpha revised", dims=("privacy",)), paper("c", "gamma")]
+    assert store.import_papers(corpus, "v2") == 3
+    assert store.version() == "v2"
+    assert marks(store) == {"a": (5, "必读"), "c": (0, None), "d": (0, None)}
+    row = store.connection().execute("SELECT title FROM papers WHERE id = 'a'").fetchone()
+    assert row == ("alpha revised",)
+
+    # 辅助表随新语料整体重建
+    assert store.get("a") == corpus[1]
+    assert store.get("b") is None
+    assert [p["id"] for p in store.page()[0]] == ["d", "a", "c"]
+    assert store.count(dimensions=["privacy"]) == 1
+    assert store.count(dimensions=["security"]) == 2
+
+def test_reopening_keeps_marks(tmp_path):
+    store = open_store(tmp_path)
+    store.import_papers([paper("a", "alpha")], "v1")
+    mark(store, "a", 4, "note")
+    reopened = open_store(tmp_path)
+    assert reopened.version() == "v1"
+    reopened.import_papers([paper("a", "alpha"), paper("b", "beta")], "v2")
+    assert marks(reopened)["a"] == (4, "note")